@@ -0,0 +1,137 @@
+"""
+Dashboard Sync
+Versioned snapshot + JSON-patch delta stream for pushing dashboard data to clients
+
+Protocol (server -> client):
+    dashboard_update  {version, data}           full snapshot
+    dashboard_delta   {from, version, patch}    RFC 6902 style ops (add/remove/replace)
+    heartbeat         {version}                 nothing changed since the client's version
+
+Clients apply a delta only when "from" equals the version they hold, then reply
+{"type": "dashboard_ack", "version": n}. A client that is out of step sends
+{"type": "dashboard_resync"} and receives a fresh snapshot.
+"""
+
+import json
+from collections import deque
+from datetime import datetime
+
+def escape_pointer(key):
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def unescape_pointer(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+def json_diff(old, new, path=""):
+    """Patch ops turning old into new (dicts recurse, equal-length lists per item)"""
+    if old == new:
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f"{path}/{escape_pointer(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{escape_pointer(key)}"
+            if key not in old:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                ops.extend(json_diff(old[key], value, child))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            ops.extend(json_diff(old_item, new_item, f"{path}/{index}"))
+        return ops
+
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+def apply_patch(document, ops):
+    """Apply json_diff ops to a JSON document, returning the new document"""
+    for op in ops:
+        tokens = [unescape_pointer(token) for token in op['path'].split("/")[1:]]
+        if not tokens:
+            document = op.get('value')
+            continue
+
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+
+        last = tokens[-1]
+        if isinstance(parent, list):
+            last = int(last)
+
+        if op['op'] == 'remove':
+            del parent[last]
+        else:
+            parent[last] = op['value']
+    return document
+
+class DashboardStream:
+    """Versioned dashboard state with a short history of deltas
+
+    update() bumps the version only when the data really changed. Callers
+    group clients by acknowledged version and encode one message per group.
+    """
+
+    def __init__(self, history=20):
+        self.version = 0
+        self.snapshot = None
+        self.deltas = deque(maxlen=history)
+
+    def update(self, data):
+        """Record new dashboard data; returns True if anything changed"""
+        # Round-trip through JSON so dates etc. compare the way clients see them
+        data = json.loads(json.dumps(data, default=str))
+        if self.snapshot is not None and data == self.snapshot:
+            return False
+
+        if self.snapshot is not None:
+            self.deltas.append((self.version, self.version + 1, json_diff(self.snapshot, data)))
+        self.snapshot = data
+        self.version += 1
+        return True
+
+    def valid_version(self, version):
+        """version if it is one this stream has issued, else None (client needs a snapshot)"""
+        if isinstance(version, int) and not isinstance(version, bool) and 0 <= version <= self.version:
+            return version
+        return None
+
+    def patch_since(self, version):
+        """Concatenated ops from version to the current one, or None if out of history"""
+        if self.valid_version(version) is None:
+            return None
+        ops = []
+        expected = version
+        for from_version, to_version, patch in self.deltas:
+            if from_version < version:
+                continue
+            if from_version != expected:
+                return None
+            ops.extend(patch)
+            expected = to_version
+        return ops if expected == self.version else None
+
+    def message_for(self, client_version):
+        """Encoded message bringing a client at client_version up to date"""
+        timestamp = datetime.now().isoformat()
+        client_version = self.valid_version(client_version)
+        patch = self.patch_since(client_version) if client_version is not None else None
+
+        if client_version == self.version:
+            message = {'type': 'heartbeat', 'version': self.version, 'timestamp': timestamp}
+        elif patch is not None:
+            message = {'type': 'dashboard_delta', 'from': client_version, 'version': self.version,
+                       'patch': patch, 'timestamp': timestamp}
+        else:
+            message = self.snapshot_message(timestamp)
+
+        return json.dumps(message)
+
+    def snapshot_message(self, timestamp=None):
+        return {'type': 'dashboard_update', 'version': self.version, 'data': self.snapshot,
+                'timestamp': timestamp or datetime.now().isoformat()}
@@ -0,0 +1,154 @@
+"""
+ETA Service
+Arrival estimates from remaining route distance and per-team, per-hour learned speeds
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import geo_utils
+
+# Speeds are learned from straight-line distance between pings, so the
+# fallback is the routing engine's road speed divided by its road factor
+DEFAULT_SPEED_KMH = 30.0 / 1.3
+
+class SpeedModel:
+    """Exponentially weighted travel speed per (team, hour of day)
+
+    Each pair of consecutive pings updates the model in O(1). Pings closer
+    than min_speed_kmh (parked at a job) or further apart than max_gap_s are
+    ignored, so time spent cleaning does not drag the travel speed down.
+    Lookups fall back from team+hour to team, then fleet+hour, then default.
+    """
+
+    def __init__(self, alpha=0.1, min_speed_kmh=3.0, max_speed_kmh=130.0, max_gap_s=600,
+                 default_speed_kmh=DEFAULT_SPEED_KMH):
+        self.alpha = alpha
+        self.min_speed = min_speed_kmh
+        self.max_speed = max_speed_kmh
+        self.max_gap = max_gap_s
+        self.default_speed = default_speed_kmh
+        self.speeds = {}
+        self.last_ping = {}
+
+    def blend(self, key, speed):
+        current = self.speeds.get(key)
+        self.speeds[key] = speed if current is None else current + self.alpha * (speed - current)
+
+    def observe(self, team_id, lat, lng, timestamp):
+        """Learn from the leg between the team's previous ping and this one"""
+        previous = self.last_ping.get(team_id)
+        self.last_ping[team_id] = (timestamp, lat, lng)
+        if previous is None:
+            return
+
+        elapsed = timestamp - previous[0]
+        if elapsed <= 0 or elapsed > self.max_gap:
+            return
+
+        speed = geo_utils.haversine_distance(previous[1:], (lat, lng)) * 3600.0 / elapsed
+        if self.min_speed <= speed <= self.max_speed:
+            hour = datetime.fromtimestamp(timestamp).hour
+            self.blend((team_id, hour), speed)
+            self.blend((team_id, None), speed)
+            self.blend((None, hour), speed)
+
+    def fit(self, team_id, pings):
+        """Learn from a time-ordered (timestamp, lat, lng) history in one pass"""
+        if len(pings) < 2:
+            return
+
+        history = np.asarray(pings, dtype=float)
+        legs = geo_utils.path_lengths(history[:, 1:])
+        elapsed = np.diff(history[:, 0])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speeds = legs * 3600.0 / elapsed
+        valid = ((elapsed > 0) & (elapsed <= self.max_gap) &
+                 (speeds >= self.min_speed) & (speeds <= self.max_speed))
+
+        for timestamp, speed in zip(history[1:, 0][valid], speeds[valid]):
+            hour = datetime.fromtimestamp(timestamp).hour
+            self.blend((team_id, hour), float(speed))
+            self.blend((team_id, None), float(speed))
+            self.blend((None, hour), float(speed))
+
+        self.last_ping[team_id] = tuple(pings[-1])
+
+    def speed(self, team_id, hour):
+        """Best available speed estimate (km/h)"""
+        for key in ((team_id, hour), (team_id, None), (None, hour)):
+            if key in self.speeds:
+                return self.speeds[key]
+        return self.default_speed
+
+class ETAService:
+    """Incremental ETAs for teams following ordered routes
+
+    set_route() precomputes suffix sums of the leg distances, so a ping only
+    costs one haversine to the next stop plus a lookup: refreshing hundreds
+    of teams every second is cheap.
+    """
+
+    def __init__(self, speed_model=None, arrival_radius_km=0.1, service_minutes=0):
+        self.speed_model = speed_model or SpeedModel()
+        self.arrival_radius = arrival_radius_km
+        self.service_minutes = service_minutes
+        self.routes = {}
+        self.estimates = {}
+
+    def set_route(self, team_id, stops):
+        """Assign the ordered (lat, lng) stops a team still has to visit"""
+        stops = [tuple(stop) for stop in stops]
+        legs = geo_utils.path_lengths(stops) if len(stops) > 1 else np.zeros(0)
+        # remaining[i] = distance from stop i to the last stop
+        remaining = np.concatenate([np.cumsum(legs[::-1])[::-1], [0.0]]) if stops else np.zeros(0)
+        self.routes[team_id] = {'stops': stops, 'remaining': remaining.tolist(), 'next': 0}
+        self.estimates.pop(team_id, None)
+
+    def update(self, team_id, lat, lng, timestamp=None):
+        """Feed one ping; returns the team's refreshed estimate (None without a route)"""
+        if timestamp is None:
+            timestamp = datetime.now().timestamp()
+        self.speed_model.observe(team_id, lat, lng, timestamp)
+        return self.estimate(team_id, lat, lng, timestamp)
+
+    def estimate(self, team_id, lat, lng, timestamp=None):
+        """Estimate from a position without learning from it"""
+        if timestamp is None:
+            timestamp = datetime.now().timestamp()
+
+        route = self.routes.get(team_id)
+        if route is None or not route['stops']:
+            return None
+
+        stops = route['stops']
+        to_next = geo_utils.haversine_distance((lat, lng), stops[route['next']])
+
+        # Reaching a stop moves the target on to the following one
+        while to_next <= self.arrival_radius and route['next'] < len(stops) - 1:
+            route['next'] += 1
+            to_next = geo_utils.haversine_distance((lat, lng), stops[route['next']])
+
+        now = datetime.fromtimestamp(timestamp)
+        speed = self.speed_model.speed(team_id, now.hour)
+        next_index = route['next']
+        remaining_km = to_next + route['remaining'][next_index]
+        service = self.service_minutes * (len(stops) - 1 - next_index)
+
+        estimate = {
+            'team_id': team_id,
+            'next_stop': next_index,
+            'remaining_km': remaining_km,
+            'speed_kmh': speed,
+            'next_eta': now + timedelta(hours=to_next / speed),
+            'eta': now + timedelta(hours=remaining_km / speed, minutes=service),
+            'updated': now
+        }
+        self.estimates[team_id] = estimate
+        return estimate
+
+    def eta(self, team_id):
+        """Latest estimate for a team, or None"""
+        return self.estimates.get(team_id)
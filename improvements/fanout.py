@@ -0,0 +1,126 @@
+"""
+Fan-out
+Serialize-once broadcasting with a bounded outbound queue and writer task per client
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict
+
+class ClientChannel:
+    """Outbound queue plus writer task for one websocket
+
+    Messages with a coalesce key (e.g. the latest GPS fix of a team)
+    replace any queued message with the same key instead of piling up, and
+    are the only ones that may be dropped: when the queue is full the oldest
+    coalescible message makes room. Job updates and chat messages are never
+    dropped silently - a client whose queue is full of them, that stays
+    backed up for slow_timeout seconds, or whose send takes longer than
+    send_timeout, is disconnected.
+    """
+
+    def __init__(self, websocket, max_queue=256, send_timeout=10.0, slow_timeout=30.0):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.slow_timeout = slow_timeout
+        self.queue = OrderedDict()
+        self.sequence = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.slow_since = None
+        self.closed = False
+        self.writer = asyncio.create_task(self.write_loop())
+
+    def enqueue(self, message, coalesce_key=None):
+        if self.closed:
+            return
+
+        key = ('coalesce', coalesce_key) if coalesce_key is not None else ('seq', next(self.sequence))
+        if key in self.queue:
+            # Newer state replaces the queued one in its original slot
+            self.queue[key] = message
+            return
+
+        if len(self.queue) >= self.max_queue:
+            oldest = next((queued for queued in self.queue if queued[0] == 'coalesce'), None)
+            if oldest is None:
+                self.close("send queue full")
+                return
+
+            del self.queue[oldest]
+            self.dropped += 1
+            if self.slow_since is None:
+                self.slow_since = time.monotonic()
+            elif time.monotonic() - self.slow_since > self.slow_timeout:
+                self.close("client too slow")
+                return
+
+        self.queue[key] = message
+        self.wakeup.set()
+
+    async def write_loop(self):
+        try:
+            while not self.closed:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+
+                while self.queue and not self.closed:
+                    _, message = self.queue.popitem(last=False)
+                    await asyncio.wait_for(self.websocket.send(message), self.send_timeout)
+
+                    if len(self.queue) < self.max_queue // 2:
+                        self.slow_since = None
+        except asyncio.TimeoutError:
+            self.close("send timed out")
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Connection closed; the connection handler unregisters the client
+            self.closed = True
+
+    def close(self, reason):
+        """Stop sending and drop the connection"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        print(f"Disconnecting slow client: {reason} ({self.dropped} messages dropped)")
+
+        if asyncio.current_task() is not self.writer:
+            self.writer.cancel()
+        asyncio.ensure_future(self.websocket.close())
+
+class FanOut:
+    """Registry of client channels; publish() encodes once and never awaits a client"""
+
+    def __init__(self, max_queue=256, send_timeout=10.0, slow_timeout=30.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.slow_timeout = slow_timeout
+        self.channels = {}
+
+    def register(self, websocket):
+        """Create the outbound channel for a new connection (call inside the event loop)"""
+        channel = self.channels[websocket] = ClientChannel(websocket, self.max_queue,
+                                                           self.send_timeout, self.slow_timeout)
+        return channel
+
+    def unregister(self, websocket):
+        channel = self.channels.pop(websocket, None)
+        if channel is not None and not channel.closed:
+            channel.closed = True
+            channel.writer.cancel()
+
+    def publish(self, message, clients=None, coalesce_key=None):
+        """Queue message for clients (default everyone); dicts are encoded once here"""
+        if not isinstance(message, str):
+            message = json.dumps(message, default=str)
+
+        targets = self.channels.values() if clients is None else (
+            self.channels.get(client) for client in clients)
+        for channel in targets:
+            if channel is not None:
+                channel.enqueue(message, coalesce_key)
@@ -0,0 +1,394 @@
+"""
+Fleet Routing Engine
+Capacity- and time-window-aware routing of a day's jobs across multiple teams
+"""
+
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+import geo_utils
+
+DEFAULT_LOCATION = (40.7128, -74.0060)
+
+def parse_job_time(job_date, job_time):
+    """Combine job_date/job_time columns into a datetime (None if unparseable)"""
+    if not job_date:
+        return None
+
+    date_text = str(job_date)[:10]
+    time_text = str(job_time or "").strip()
+
+    if not time_text:
+        try:
+            return datetime.strptime(date_text, "%Y-%m-%d")
+        except ValueError:
+            return None
+
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %I:%M %p", "%Y-%m-%d %I:%M%p"):
+        try:
+            return datetime.strptime(f"{date_text} {time_text}", fmt)
+        except ValueError:
+            continue
+    return None
+
+class TeamRoute:
+    """One team's ordered stops plus the schedule needed for O(1) insertion checks"""
+
+    def __init__(self, team_id, depot, shift_start, shift_end, capacity):
+        self.team_id = team_id
+        self.depot = depot
+        self.shift_start = shift_start
+        self.shift_end = shift_end
+        self.capacity = capacity
+        self.nodes = []
+        self.start = []    # service start (minutes) at each stop
+        self.latest = []   # latest service start that keeps the rest of the route feasible
+        self.load = 0.0
+
+    def refresh(self, router):
+        """Recompute forward start times and backward latest starts"""
+        travel = router.travel
+        service = router.service
+        ready = router.ready
+        due = router.due
+
+        self.start = []
+        previous = self.depot
+        depart = self.shift_start
+        for node in self.nodes:
+            begin = max(depart + travel[previous][node], ready[node])
+            self.start.append(begin)
+            depart = begin + service[node]
+            previous = node
+
+        self.latest = [0.0] * len(self.nodes)
+        next_node = self.depot
+        next_latest = self.shift_end
+        for k in range(len(self.nodes) - 1, -1, -1):
+            node = self.nodes[k]
+            next_latest = min(due[node], next_latest - service[node] - travel[node][next_node])
+            self.latest[k] = next_latest
+            next_node = node
+
+        self.load = sum(router.demand[node] for node in self.nodes)
+
+    def distance(self, router):
+        """Total driven distance including leaving and returning to the depot"""
+        stops = [self.depot] + self.nodes + [self.depot]
+        return sum(router.dist[stops[k]][stops[k + 1]] for k in range(len(stops) - 1))
+
+class FleetRouter:
+    """Multi-team vehicle routing with time windows (VRPTW)
+
+    Jobs are placed by cheapest feasible insertion in order of their window
+    deadlines, then improved with inter-route relocate moves until no move
+    helps or the time limit runs out. Feasibility of an insertion is checked
+    in O(1) from each route's forward start times and backward latest starts.
+
+    After solve(), add_job() and remove_job() update the solution in place
+    with a cheapest insertion plus a short local repair of the touched route.
+    """
+
+    def __init__(self, optimizer=None):
+        if optimizer is None:
+            from quantum_optimization import QuantumOptimizer
+            optimizer = QuantumOptimizer()
+        self.optimizer = optimizer
+
+    def solve(self, teams, jobs, constraints=None):
+        """Route jobs across teams
+
+        Team keys: id, location (depot), shift_start ("HH:MM"), shift_hours,
+        capacity (in job demand units). Job keys: id, location, job_date,
+        job_time (window opens), window_minutes, duration (minutes), demand.
+        Missing values fall back to the matching constraints keys.
+
+        Returns a dict with per-team routes, unassigned job ids and totals.
+        """
+        constraints = constraints or {}
+        started = time.perf_counter()
+
+        self.prepare(teams, jobs, constraints)
+
+        # Tightest deadlines first so urgent jobs get first pick of the slots
+        order = sorted(range(len(jobs)), key=lambda j: (self.due[j], self.ready[j]))
+        for job in order:
+            if not self.insert(job):
+                self.unassigned.append(job)
+
+        time_limit = constraints.get('time_limit', 5.0)
+        self.improve(started + time_limit)
+
+        # Retry anything that did not fit once routes have tightened up
+        self.unassigned = [job for job in self.unassigned if not self.insert(job)]
+
+        return self.build_solution(time.perf_counter() - started)
+
+    def add_job(self, job, repair_time=0.05):
+        """Insert one new job into the current solution and repair its route"""
+        started = time.perf_counter()
+
+        node = len(self.node_jobs)
+        location = job.get('location', DEFAULT_LOCATION)
+        ready, due = self.time_window(job, parse_job_time(job.get('job_date'), job.get('job_time')))
+        self.ready.append(ready)
+        self.due.append(due)
+        self.service.append(float(job.get('duration', self.default_duration)))
+        self.demand.append(float(job.get('demand', 1)))
+
+        # Grow the matrices by one row and column instead of rebuilding them
+        row = (self.road_factor * geo_utils.one_to_many(location, self.locations)).tolist() + [0.0]
+        for k, distance in enumerate(row[:-1]):
+            self.dist[k].append(distance)
+            self.travel[k].append(distance * 60.0 / self.speed_kmh)
+        self.dist.append(row)
+        self.travel.append([distance * 60.0 / self.speed_kmh for distance in row])
+
+        self.locations.append(location)
+        self.node_jobs.append(job)
+        self.node_of[job.get('id', node)] = node
+
+        if self.insert(node):
+            route = self.route_of[node]
+            self.improve(time.perf_counter() + repair_time, jobs=list(route.nodes))
+        else:
+            self.unassigned.append(node)
+
+        return self.build_solution(time.perf_counter() - started)
+
+    def remove_job(self, job_id, repair_time=0.05):
+        """Cancel a job, then refill and repair the route it leaves"""
+        started = time.perf_counter()
+
+        node = self.node_of.pop(job_id)
+        self.node_jobs[node] = None
+
+        if node in self.route_of:
+            route, _ = self.remove(node)
+
+            # The freed slot may now fit a job that was previously left out
+            self.unassigned = [job for job in self.unassigned if not self.insert(job, [route])]
+            self.improve(time.perf_counter() + repair_time, jobs=list(route.nodes))
+        else:
+            self.unassigned.remove(node)
+
+        return self.build_solution(time.perf_counter() - started)
+
+    def prepare(self, teams, jobs, constraints):
+        """Build travel/distance matrices, time windows and empty routes"""
+        self.teams = teams
+        n_jobs = len(jobs)
+        self.rng = random.Random(constraints.get('seed'))
+
+        # Times are minutes after midnight of the planning day
+        job_times = [parse_job_time(job.get('job_date'), job.get('job_time')) for job in jobs]
+        reference = constraints.get('date')
+        if reference is None:
+            known = [dt for dt in job_times if dt is not None]
+            reference = min(known) if known else datetime.now()
+        if isinstance(reference, str):
+            reference = datetime.strptime(reference[:10], "%Y-%m-%d")
+        self.reference = datetime(reference.year, reference.month, reference.day)
+
+        self.default_window = constraints.get('time_window_minutes', 120)
+        self.default_duration = constraints.get('service_minutes', 60)
+
+        self.ready = []
+        self.due = []
+        self.service = []
+        self.demand = []
+        for job, job_dt in zip(jobs, job_times):
+            ready, due = self.time_window(job, job_dt)
+            self.ready.append(ready)
+            self.due.append(due)
+            self.service.append(float(job.get('duration', self.default_duration)))
+            self.demand.append(float(job.get('demand', 1)))
+
+        # Depots follow the jobs in the node numbering
+        locations = [job.get('location', DEFAULT_LOCATION) for job in jobs]
+        locations += [team.get('location', DEFAULT_LOCATION) for team in teams]
+        for _ in teams:
+            self.ready.append(0.0)
+            self.due.append(24 * 60.0)
+            self.service.append(0.0)
+            self.demand.append(0.0)
+
+        matrix = self.optimizer.build_distance_matrix(locations)
+        self.speed_kmh = constraints.get('speed_kmh', 30.0)
+        self.road_factor = constraints.get('road_factor', 1.3)
+        self.dist = (matrix * self.road_factor).tolist()
+        self.travel = (matrix * self.road_factor * 60.0 / self.speed_kmh).tolist()
+        self.locations = locations
+
+        default_shift_start = constraints.get('shift_start', "08:00")
+        default_shift_hours = constraints.get('shift_hours', 8)
+        default_capacity = constraints.get('capacity', math.inf)
+
+        self.routes = []
+        for k, team in enumerate(teams):
+            hours, minutes = str(team.get('shift_start', default_shift_start)).split(":")[:2]
+            shift_start = int(hours) * 60 + int(minutes)
+            shift_end = shift_start + 60.0 * team.get('shift_hours', default_shift_hours)
+            route = TeamRoute(team.get('id', k), n_jobs + k, shift_start, shift_end,
+                              team.get('capacity', default_capacity))
+            self.routes.append(route)
+
+        # Node bookkeeping; depots have no job and cancelled jobs leave a
+        # None behind so node numbers stay stable
+        self.node_jobs = list(jobs) + [None] * len(teams)
+        self.node_of = {job.get('id', j): j for j, job in enumerate(jobs)}
+        self.route_of = {}
+        self.unassigned = []
+
+    def time_window(self, job, job_dt):
+        """(ready, due) minutes for a job on the planning day"""
+        if job_dt is not None and job.get('job_time'):
+            opens = (job_dt - self.reference).total_seconds() / 60.0
+            return opens, opens + job.get('window_minutes', self.default_window)
+
+        # No booked time - anywhere inside the shift will do
+        return 0.0, 24 * 60.0
+
+    def best_insertion(self, job, routes=None):
+        """Cheapest feasible (added distance, route, position) for job, or None"""
+        dist = self.dist
+        travel = self.travel
+        service = self.service
+        ready_u = self.ready[job]
+        due_u = self.due[job]
+        service_u = service[job]
+        demand_u = self.demand[job]
+
+        best = None
+        for route in (routes or self.routes):
+            if route.load + demand_u > route.capacity:
+                continue
+
+            nodes = route.nodes
+            previous = route.depot
+            depart = route.shift_start
+
+            for pos in range(len(nodes) + 1):
+                # Stops only get later along a route, so once we cannot
+                # reach the job before its window closes we never will
+                arrival = depart + travel[previous][job]
+                if arrival > due_u:
+                    break
+                begin = max(arrival, ready_u)
+
+                if pos < len(nodes):
+                    following = nodes[pos]
+                    following_latest = route.latest[pos]
+                else:
+                    following = route.depot
+                    following_latest = route.shift_end
+
+                following_start = max(begin + service_u + travel[job][following], self.ready[following])
+                if following_start <= following_latest:
+                    added = dist[previous][job] + dist[job][following] - dist[previous][following]
+                    if best is None or added < best[0]:
+                        best = (added, route, pos)
+
+                if pos < len(nodes):
+                    previous = following
+                    depart = route.start[pos] + service[following]
+
+        return best
+
+    def insert(self, job, routes=None):
+        """Insert job at its cheapest feasible position; False if none exists"""
+        best = self.best_insertion(job, routes)
+        if best is None:
+            return False
+
+        _, route, pos = best
+        route.nodes.insert(pos, job)
+        route.refresh(self)
+        self.route_of[job] = route
+        return True
+
+    def remove(self, job):
+        """Take job off its route, returning (route, position)"""
+        route = self.route_of.pop(job)
+        pos = route.nodes.index(job)
+        del route.nodes[pos]
+        route.refresh(self)
+        return route, pos
+
+    def removal_gain(self, route, pos):
+        """Distance saved by removing the stop at pos from route"""
+        nodes = route.nodes
+        job = nodes[pos]
+        previous = nodes[pos - 1] if pos > 0 else route.depot
+        following = nodes[pos + 1] if pos + 1 < len(nodes) else route.depot
+        return self.dist[previous][job] + self.dist[job][following] - self.dist[previous][following]
+
+    def improve(self, deadline, jobs=None):
+        """Inter-route relocate local search until no gain or deadline
+
+        jobs limits which stops are considered for moving (default: all).
+        """
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            routed = [job for job in (jobs if jobs is not None else self.route_of) if job in self.route_of]
+            self.rng.shuffle(routed)
+
+            for job in routed:
+                if time.perf_counter() >= deadline:
+                    break
+
+                route = self.route_of[job]
+                pos = route.nodes.index(job)
+                gain = self.removal_gain(route, pos)
+                if gain <= 1e-9:
+                    continue
+
+                self.remove(job)
+                best = self.best_insertion(job)
+
+                if best is not None and best[0] < gain - 1e-9:
+                    _, target, target_pos = best
+                    improved = True
+                else:
+                    # Removal keeps a route feasible, so the old slot is
+                    # always available to go back to
+                    target, target_pos = route, pos
+
+                target.nodes.insert(target_pos, job)
+                target.refresh(self)
+                self.route_of[job] = target
+
+    def build_solution(self, elapsed):
+        """Convert internal routes into the public solution dict"""
+        routes = {}
+        total_distance = 0.0
+
+        for route in self.routes:
+            distance = route.distance(self)
+            total_distance += distance
+
+            stops = []
+            for node, begin in zip(route.nodes, route.start):
+                job = self.node_jobs[node]
+                stops.append({
+                    'job_id': job.get('id', node),
+                    'start': self.reference + timedelta(minutes=begin),
+                    'end': self.reference + timedelta(minutes=begin + self.service[node])
+                })
+
+            routes[route.team_id] = {
+                'stops': stops,
+                'jobs': [stop['job_id'] for stop in stops],
+                'distance': distance,
+                'load': route.load
+            }
+
+        return {
+            'routes': routes,
+            'unassigned': [self.node_jobs[job].get('id', job) for job in self.unassigned],
+            'total_distance': total_distance,
+            'elapsed': elapsed
+        }
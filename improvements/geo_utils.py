@@ -0,0 +1,143 @@
+"""
+Geo Utilities
+Shared scalar and vectorized haversine distances for GPS and optimization modules
+"""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # Earth's radius in kilometers
+
+# Largest block (in matrix cells) computed in one go by distance_matrix;
+# broadcasting needs several temporaries of this size
+DEFAULT_BLOCK_CELLS = 4 * 1024 * 1024
+
+def haversine_distance(coord1, coord2):
+    """Distance (km) between two (lat, lng) pairs - cheapest for a single pair"""
+    lat1, lon1 = coord1
+    lat2, lon2 = coord2
+
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+
+    a = (math.sin(dlat/2) * math.sin(dlat/2) +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(dlon/2) * math.sin(dlon/2))
+
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return EARTH_RADIUS_KM * c
+
+def parse_coordinates(lat, lng):
+    """(lat, lng) as floats if both are valid coordinates, else None"""
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    # NaN fails both range checks
+    if -90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0:
+        return lat, lng
+    return None
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Vectorized haversine (km); arguments are degrees and broadcast like NumPy"""
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlng = np.radians(lng2) - np.radians(lng1)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(np.clip(1 - a, 0.0, None)))
+
+def as_coords(locations):
+    """(n, 2) float array of (lat, lng) rows"""
+    return np.asarray(locations, dtype=float).reshape(-1, 2)
+
+def one_to_many(origin, locations):
+    """Distances (km) from one (lat, lng) to every location"""
+    coords = as_coords(locations)
+    return haversine(origin[0], origin[1], coords[:, 0], coords[:, 1])
+
+def path_lengths(locations):
+    """Leg distances (km) between consecutive locations"""
+    coords = as_coords(locations)
+    return haversine(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+def iter_distance_blocks(origins, destinations=None, block_cells=DEFAULT_BLOCK_CELLS):
+    """Yield (row_start, block) slices of the origins x destinations matrix
+
+    Each block holds at most block_cells distances, so callers can reduce or
+    stream huge matrices without ever materializing them.
+    """
+    origins = as_coords(origins)
+    destinations = origins if destinations is None else as_coords(destinations)
+
+    rows_per_block = max(1, block_cells // max(len(destinations), 1))
+    dest_lat = destinations[None, :, 0]
+    dest_lng = destinations[None, :, 1]
+
+    for start in range(0, len(origins), rows_per_block):
+        rows = origins[start:start + rows_per_block]
+        yield start, haversine(rows[:, 0, None], rows[:, 1, None], dest_lat, dest_lng)
+
+def distance_matrix(origins, destinations=None, dtype=np.float64, out=None,
+                    block_cells=DEFAULT_BLOCK_CELLS):
+    """Many-to-many distances (km), computed block by block
+
+    Temporaries stay bounded by block_cells. Pass dtype=np.float32 to halve
+    the result, or out= (for example an np.memmap) to keep it off the heap.
+    """
+    n_rows = len(as_coords(origins))
+    n_cols = n_rows if destinations is None else len(as_coords(destinations))
+
+    if out is None:
+        out = np.empty((n_rows, n_cols), dtype=dtype)
+
+    for start, block in iter_distance_blocks(origins, destinations, block_cells):
+        out[start:start + len(block)] = block
+    return out
+
+def douglas_peucker(locations, tolerance_km):
+    """Indices of the points kept by Douglas-Peucker simplification
+
+    Points are projected to local km so the tolerance is a real distance;
+    the recursion runs on an explicit stack so long tracks cannot hit the
+    recursion limit.
+    """
+    coords = as_coords(locations)
+    n = len(coords)
+    if n < 3:
+        return np.arange(n)
+
+    cos_lat = math.cos(math.radians(coords[:, 0].mean()))
+    points = np.radians(coords[:, ::-1]) * EARTH_RADIUS_KM
+    points[:, 0] *= cos_lat
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        segment = points[end] - points[start]
+        relative = points[start + 1:end] - points[start]
+        length2 = float(segment @ segment)
+
+        # Distance to the segment (not the infinite line), so GPS tracks that
+        # double back are not collapsed
+        if length2 > 0:
+            t = np.clip(relative @ segment / length2, 0.0, 1.0)
+            relative = relative - t[:, None] * segment
+        distances = np.hypot(relative[:, 0], relative[:, 1])
+
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance_km:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return np.flatnonzero(keep)
@@ -0,0 +1,226 @@
+"""
+Geocoding Module
+Persistent SQLite geocode cache, address normalization and pluggable geocoder backends
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+try:
+    import requests
+except ImportError:  # Only GoogleGeocoder needs requests; headless tools run without it
+    requests = None
+
+# How long a "no such address" answer is trusted before the backend is asked again
+NEGATIVE_TTL = timedelta(days=7)
+
+# Google statuses that say nothing about the address itself
+TRANSIENT_STATUSES = {'OVER_QUERY_LIMIT', 'OVER_DAILY_LIMIT', 'REQUEST_DENIED', 'UNKNOWN_ERROR'}
+
+class GeocodingUnavailable(Exception):
+    """The backend could not answer right now (network, quota); nothing should be cached"""
+
+# Placeholder result for an address whose lookup hit GeocodingUnavailable
+UNAVAILABLE = object()
+
+# Common suffix spellings collapsed to one form so variants share a cache row
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'boulevard': 'blvd', 'road': 'rd',
+    'drive': 'dr', 'lane': 'ln', 'court': 'ct', 'place': 'pl', 'square': 'sq',
+    'parkway': 'pkwy', 'highway': 'hwy', 'terrace': 'ter', 'suite': 'ste',
+    'apartment': 'apt', 'floor': 'fl', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w'
+}
+
+def normalize_address(address):
+    """Canonical cache key for an address string"""
+    text = re.sub(r"[^\w\s#-]", " ", str(address or "").lower())
+    words = [ADDRESS_ABBREVIATIONS.get(word, word) for word in text.split()]
+    return " ".join(words)
+
+class MockGeocoder:
+    """Offline backend backed by a fixed address table (demo data and tests)"""
+
+    name = "mock"
+
+    def __init__(self, known=None):
+        known = known if known is not None else {
+            "123 Business Ave": (40.7128, -74.0060),
+            "456 Office St": (40.7589, -73.9851),
+            "789 Corporate Blvd": (40.6892, -74.0445)
+        }
+        self.known = {normalize_address(address): coords for address, coords in known.items()}
+
+    def geocode(self, address):
+        return self.known.get(normalize_address(address))
+
+class GoogleGeocoder:
+    """Google Maps Geocoding API backend"""
+
+    name = "google"
+    url = "https://maps.googleapis.com/maps/api/geocode/json"
+
+    def __init__(self, api_key, timeout=10):
+        if requests is None:
+            raise ImportError("GoogleGeocoder needs the requests package")
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def geocode(self, address):
+        """(lat, lng), or None for an address Google does not know; raises GeocodingUnavailable"""
+        try:
+            response = requests.get(self.url, params={'address': address, 'key': self.api_key},
+                                    timeout=self.timeout)
+            data = response.json()
+        except Exception as e:
+            raise GeocodingUnavailable(f"Geocoding request failed for {address}: {e}")
+
+        status = data.get('status')
+        if status in TRANSIENT_STATUSES or status not in ('OK', 'ZERO_RESULTS'):
+            raise GeocodingUnavailable(f"Geocoding unavailable for {address}: {status}")
+        if status != 'OK' or not data.get('results'):
+            return None
+
+        location = data['results'][0]['geometry']['location']
+        return (location['lat'], location['lng'])
+
+class GeocodeCache:
+    """SQLite table of normalized address -> coordinates
+
+    Addresses the backend does not know are stored too (with NULL
+    coordinates) so they are not sent again on every request; those rows
+    expire after negative_ttl. Rows are tagged with the backend that wrote
+    them and only read back for that backend, so switching from the mock to
+    Google does not inherit the mock's answers.
+    """
+
+    def __init__(self, path=":memory:", negative_ttl=NEGATIVE_TTL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                normalized TEXT PRIMARY KEY,
+                address TEXT,
+                lat REAL,
+                lng REAL,
+                source TEXT,
+                updated_at TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def get_many(self, keys, source):
+        """Map of normalized key -> (lat, lng) or None for every usable row from source"""
+        keys = list(keys)
+        found = {}
+        expired_before = (datetime.now() - self.negative_ttl).isoformat()
+
+        with self.lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT normalized, lat, lng FROM geocodes WHERE normalized IN ({placeholders}) "
+                    "AND source = ? AND (lat IS NOT NULL OR updated_at >= ?)",
+                    chunk + [source, expired_before]
+                ).fetchall()
+                for key, lat, lng in rows:
+                    found[key] = (lat, lng) if lat is not None else None
+        return found
+
+    def put_many(self, entries, source):
+        """Store (normalized, address, coords or None) rows in one transaction"""
+        now = datetime.now().isoformat()
+        rows = [(key, address, coords[0] if coords else None, coords[1] if coords else None, source, now)
+                for key, address, coords in entries]
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO geocodes (normalized, address, lat, lng, source, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+
+    def clear_failures(self):
+        """Forget cached misses so they are retried"""
+        with self.lock:
+            self.conn.execute("DELETE FROM geocodes WHERE lat IS NULL")
+            self.conn.commit()
+
+class GeocodingService:
+    """Cache-first address resolution over a pluggable backend
+
+    A backend only needs geocode(address) -> (lat, lng) or None; if it also
+    offers geocode_many(addresses) that is used for bulk misses. Backends
+    raise GeocodingUnavailable for errors that say nothing about the address
+    (timeouts, quota); those addresses resolve to None but are not cached.
+    """
+
+    def __init__(self, backend=None, cache=None):
+        self.backend = backend or MockGeocoder()
+        self.cache = cache or GeocodeCache()
+
+    def resolve(self, address):
+        """Coordinates for one address, or None if it cannot be geocoded"""
+        return self.resolve_many([address])[address]
+
+    def resolve_many(self, addresses):
+        """Map every address to its coordinates (or None)
+
+        Duplicates and spelling variants are looked up once; cached entries
+        are read in bulk and only the misses reach the backend.
+        """
+        keys = {address: normalize_address(address) for address in addresses}
+        unique = {}
+        for address, key in keys.items():
+            unique.setdefault(key, address)
+
+        source = getattr(self.backend, 'name', type(self.backend).__name__)
+        resolved = self.cache.get_many(unique, source)
+        missing = [key for key in unique if key not in resolved]
+
+        if missing:
+            queries = [unique[key] for key in missing]
+            results = self.lookup(queries)
+
+            entries = []
+            for key, query, coords in zip(missing, queries, results):
+                if coords is UNAVAILABLE:
+                    resolved[key] = None
+                    continue
+                resolved[key] = tuple(coords) if coords else None
+                entries.append((key, query, resolved[key]))
+            if entries:
+                self.cache.put_many(entries, source)
+
+        return {address: resolved[key] for address, key in keys.items()}
+
+    def lookup(self, queries):
+        """Backend results in order; UNAVAILABLE marks answers that must not be cached"""
+        if hasattr(self.backend, 'geocode_many'):
+            try:
+                return self.backend.geocode_many(queries)
+            except GeocodingUnavailable as e:
+                print(e)
+                return [UNAVAILABLE] * len(queries)
+
+        results = []
+        for query in queries:
+            try:
+                results.append(self.backend.geocode(query))
+            except GeocodingUnavailable as e:
+                # Quota and network errors hit every remaining address too
+                print(e)
+                results.extend([UNAVAILABLE] * (len(queries) - len(results)))
+                break
+        return results
@@ -0,0 +1,259 @@
+"""
+Geofence Engine
+Job-site circles and polygons checked against every GPS ping to detect arrivals and departures
+"""
+
+import math
+from datetime import datetime
+
+from geo_utils import EARTH_RADIUS_KM
+
+DEFAULT_SITE_RADIUS_M = 75
+
+# Job status set automatically when a team enters a job-site fence. Departures
+# are only reported: a lunch run or GPS drift past the margin must not mark
+# a job Completed
+JOB_STATUS_ON_EVENT = {
+    'arrival': 'In Progress'
+}
+
+# Jobs that get a fence
+ACTIVE_JOB_STATUSES = ('Scheduled', 'In Progress')
+
+JOB_SITE_QUERY = """
+    SELECT j.id, j.status, j.location, c.address, c.city, c.state, c.zip_code
+    FROM jobs j
+    LEFT JOIN clients c ON j.client_id = c.id
+"""
+
+def job_fence_id(job_id):
+    return f"job:{job_id}"
+
+class GeofenceEngine:
+    """Circle and polygon fences bucketed on a uniform grid
+
+    Each fence is registered in every grid cell its bounding box touches, so
+    a ping only tests the handful of fences in its own cell plus the fences
+    the team is currently inside - the cost does not grow with the total
+    number of fences. Circles use exit_margin_m of hysteresis so GPS jitter
+    at the edge does not produce arrival/departure flapping.
+    """
+
+    def __init__(self, cell_size_km=0.5, reference_lat=None, exit_margin_m=25):
+        self.cell_size = cell_size_km
+        self.reference_lat = reference_lat
+        self.cos_lat = math.cos(math.radians(reference_lat)) if reference_lat is not None else None
+        self.exit_margin_km = exit_margin_m / 1000.0
+        self.fences = {}
+        self.cells = {}
+        self.inside = {}
+        self.listeners = []
+
+    def project(self, lat, lng):
+        """Equirectangular projection to km around the reference latitude"""
+        if self.cos_lat is None:
+            # The first fence fixes the projection for the whole engine
+            self.reference_lat = lat
+            self.cos_lat = math.cos(math.radians(lat))
+        return (math.radians(lng) * EARTH_RADIUS_KM * self.cos_lat,
+                math.radians(lat) * EARTH_RADIUS_KM)
+
+    def cell_of(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def add_circle(self, fence_id, lat, lng, radius_m=DEFAULT_SITE_RADIUS_M, job_id=None):
+        """Register (or replace) a circular fence"""
+        x, y = self.project(lat, lng)
+        radius = radius_m / 1000.0
+        self.register({
+            'id': fence_id,
+            'job_id': job_id,
+            'shape': 'circle',
+            'center': (x, y),
+            'radius': radius,
+            'bbox': (x - radius, y - radius, x + radius, y + radius)
+        })
+
+    def add_polygon(self, fence_id, vertices, job_id=None):
+        """Register (or replace) a polygon fence from (lat, lng) vertices"""
+        points = [self.project(lat, lng) for lat, lng in vertices]
+        if len(points) < 3:
+            raise ValueError("A polygon fence needs at least three vertices")
+
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        self.register({
+            'id': fence_id,
+            'job_id': job_id,
+            'shape': 'polygon',
+            'points': points,
+            'bbox': (min(xs), min(ys), max(xs), max(ys))
+        })
+
+    def add_job_site(self, job_id, lat, lng, radius_m=DEFAULT_SITE_RADIUS_M):
+        """Circular fence around a job address, keyed by the job id"""
+        self.add_circle(job_fence_id(job_id), lat, lng, radius_m, job_id=job_id)
+
+    def register(self, fence):
+        # Replacing a fence keeps the teams inside it, so re-registering an
+        # unchanged job site does not produce a second arrival
+        if fence['id'] in self.fences:
+            self.unindex(self.fences.pop(fence['id']))
+
+        min_x, min_y, max_x, max_y = fence['bbox']
+        # Circles keep their hysteresis band inside the indexed cells
+        if fence['shape'] == 'circle':
+            margin = self.exit_margin_km
+            min_x, min_y, max_x, max_y = min_x - margin, min_y - margin, max_x + margin, max_y + margin
+
+        low_x, low_y = self.cell_of(min_x, min_y)
+        high_x, high_y = self.cell_of(max_x, max_y)
+        fence['cells'] = [(cx, cy) for cx in range(low_x, high_x + 1) for cy in range(low_y, high_y + 1)]
+
+        for cell in fence['cells']:
+            self.cells.setdefault(cell, []).append(fence['id'])
+        self.fences[fence['id']] = fence
+
+    def remove(self, fence_id):
+        """Drop a fence; teams inside it get no departure event"""
+        fence = self.fences.pop(fence_id, None)
+        if fence is None:
+            return
+
+        self.unindex(fence)
+        for fence_ids in self.inside.values():
+            fence_ids.discard(fence_id)
+
+    def unindex(self, fence):
+        for cell in fence['cells']:
+            bucket = self.cells[cell]
+            bucket.remove(fence['id'])
+            if not bucket:
+                del self.cells[cell]
+
+    def add_listener(self, callback):
+        """Call callback(event) for every arrival or departure"""
+        self.listeners.append(callback)
+
+    def contains(self, fence, x, y, was_inside=False):
+        if fence['shape'] == 'circle':
+            cx, cy = fence['center']
+            radius = fence['radius'] + (self.exit_margin_km if was_inside else 0.0)
+            return (x - cx) ** 2 + (y - cy) ** 2 <= radius * radius
+
+        min_x, min_y, max_x, max_y = fence['bbox']
+        if x < min_x or x > max_x or y < min_y or y > max_y:
+            return False
+
+        # Ray casting
+        inside = False
+        points = fence['points']
+        x1, y1 = points[-1]
+        for x2, y2 in points:
+            if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+                inside = not inside
+            x1, y1 = x2, y2
+        return inside
+
+    def check(self, team_id, lat, lng, timestamp=None):
+        """Update a team's position and return the arrival/departure events it caused"""
+        if not self.fences:
+            return []
+
+        x, y = self.project(lat, lng)
+        previous = self.inside.get(team_id, set())
+        candidates = set(self.cells.get(self.cell_of(x, y), ())) | previous
+
+        current = {fence_id for fence_id in candidates
+                   if self.contains(self.fences[fence_id], x, y, fence_id in previous)}
+        self.inside[team_id] = current
+
+        if current == previous:
+            return []
+
+        timestamp = timestamp or datetime.now().isoformat()
+        events = []
+        for kind, fence_ids in (('departure', previous - current), ('arrival', current - previous)):
+            for fence_id in fence_ids:
+                events.append({
+                    'type': f'geofence_{kind}',
+                    'event': kind,
+                    'team_id': team_id,
+                    'fence_id': fence_id,
+                    'job_id': self.fences[fence_id]['job_id'],
+                    'lat': lat,
+                    'lng': lng,
+                    'timestamp': timestamp
+                })
+
+        for event in events:
+            for callback in self.listeners:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Geofence listener error: {e}")
+
+        return events
+
+class JobSiteFences:
+    """Keeps one circular fence per active job in the jobs table
+
+    load() registers every Scheduled / In Progress job at startup; refresh()
+    is called whenever a job is created, updated or cancelled. Addresses go
+    through a GeocodingService (the job's own location first, then its
+    client's address). Jobs that cannot be geocoded get no fence rather than
+    one at a fallback position.
+    """
+
+    def __init__(self, engine, db_manager, geocoder, radius_m=DEFAULT_SITE_RADIUS_M):
+        self.engine = engine
+        self.db_manager = db_manager
+        self.geocoder = geocoder
+        self.radius_m = radius_m
+
+    def load(self):
+        """Fence every active job and drop fences of jobs that are no longer active"""
+        placeholders = ",".join("?" * len(ACTIVE_JOB_STATUSES))
+        rows = self.db_manager.fetch_all(JOB_SITE_QUERY + f" WHERE j.status IN ({placeholders})",
+                                         ACTIVE_JOB_STATUSES) or []
+        placed = self.place(rows)
+
+        stale = [fence_id for fence_id, fence in self.engine.fences.items()
+                 if fence['job_id'] is not None and fence_id not in placed]
+        for fence_id in stale:
+            self.engine.remove(fence_id)
+        return len(placed)
+
+    def refresh(self, job_id):
+        """Re-read one job: fence it while active, otherwise remove its fence"""
+        rows = self.db_manager.fetch_all(JOB_SITE_QUERY + " WHERE j.id = ?", (job_id,)) or []
+        placed = self.place([row for row in rows if row['status'] in ACTIVE_JOB_STATUSES])
+
+        if job_fence_id(job_id) not in placed:
+            self.engine.remove(job_fence_id(job_id))
+        return bool(placed)
+
+    def place(self, rows):
+        """Geocode rows in one batch and register their fences; returns the fence ids"""
+        candidates = {row['id']: self.addresses(row) for row in rows}
+        resolved = self.geocoder.resolve_many({address for addresses in candidates.values()
+                                               for address in addresses})
+
+        placed = set()
+        for job_id, addresses in candidates.items():
+            coords = next((resolved[address] for address in addresses if resolved[address]), None)
+            if coords is not None:
+                self.engine.add_job_site(job_id, coords[0], coords[1], self.radius_m)
+                placed.add(job_fence_id(job_id))
+        return placed
+
+    def addresses(self, row):
+        """Addresses to try for a job, most specific first"""
+        addresses = []
+        if row.get('location'):
+            addresses.append(row['location'])
+        if row.get('address'):
+            parts = [row['address'], row.get('city'), " ".join(
+                part for part in (row.get('state'), row.get('zip_code')) if part)]
+            addresses.append(", ".join(part for part in parts if part))
+        return addresses
@@ -11,72 +11,17 @@ import math
 from datetime import datetime
 import threading
 import time
-
-class GPSManager:
-    def __init__(self):
-        self.api_key = "demo_key"  # Replace with actual API key
-        self.team_locations = {}
-        self.routes = {}
-        
-    def get_coordinates(self, address):
-        """Convert address to GPS coordinates (mock implementation)"""
-        # In production, use Google Maps Geocoding API
-        mock_coords = {
-            "123 Business Ave": (40.7128, -74.0060),
-            "456 Office St": (40.7589, -73.9851),
-            "789 Corporate Blvd": (40.6892, -74.0445)
-        }
-        
-        return mock_coords.get(address, (40.7128, -74.0060))
-    
-    def calculate_distance(self, coord1, coord2):
-        """Calculate distance between two coordinates"""
-        lat1, lon1 = coord1
-        lat2, lon2 = coord2
-        
-        # Haversine formula
-        R = 6371  # Earth's radius in kilometers
-        
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(dlat/2) * math.sin(dlat/2) + 
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
-             math.sin(dlon/2) * math.sin(dlon/2))
-        
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        distance = R * c
-        
-        return distance
-    
-    def optimize_route(self, locations):
-        """Optimize route for multiple locations"""
-        if len(locations) <= 2:
-            return locations
-        
-        # Simple nearest neighbor algorithm
-        optimized = [locations[0]]
-        remaining = locations[1:]
-        
-        while remaining:
-            current = optimized[-1]
-            nearest = min(remaining, key=lambda loc: self.calculate_distance(current, loc))
-            optimized.append(nearest)
-            remaining.remove(nearest)
-        
-        return optimized
-    
-    def update_team_location(self, team_id, lat, lng):
-        """Update team location"""
-        self.team_locations[team_id] = {
-            'lat': lat,
-            'lng': lng,
-            'timestamp': datetime.now(),
-            'status': 'active'
-        }
+import numpy as np
+from gps_manager import GPSManager
+from map_layers import (MarkerLayer, LineLayer, PinLayer, ClusterLayer, draw_grid,
+                        grid_clusters, segment_visible, restack)
+from map_projection import MapViewport, km_per_pixel
+from map_tiles import open_tile_layer
+from ui_bridge import UIBridge
+from track_replay import load_timelines, replay_bounds
 
 class AdvancedGPSWidget(ctk.CTkFrame):
-    def __init__(self, parent, gps_manager):
+    def __init__(self, parent, gps_manager, tile_path=None):
         super().__init__(parent, fg_color="#1a1c2e")
         self.gps_manager = gps_manager
         
@@ -93,18 +38,41 @@ class AdvancedGPSWidget(ctk.CTkFrame):
         controls_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
         controls_frame.pack(side="right")
         
-        zoom_in_btn = ctk.CTkButton(controls_frame, text="🔍+", width=40,
+        zoom_in_btn = ctk.CTkButton(controls_frame, text="🔍+", width=40, command=self.zoom_in,
                                   fg_color="#4dc4d9", hover_color="#3ba8c4")
         zoom_in_btn.pack(side="left", padx=2)
         
-        zoom_out_btn = ctk.CTkButton(controls_frame, text="🔍-", width=40,
+        zoom_out_btn = ctk.CTkButton(controls_frame, text="🔍-", width=40, command=self.zoom_out,
                                    fg_color="#4dc4d9", hover_color="#3ba8c4")
         zoom_out_btn.pack(side="left", padx=2)
         
+        trails_btn = ctk.CTkButton(controls_frame, text="🛰️ TRAILS", width=80, command=self.toggle_trails,
+                                 fg_color="#ff9f43", hover_color="#e68a2e")
+        trails_btn.pack(side="left", padx=2)
+        
         # Map canvas
         self.map_canvas = tk.Canvas(self, bg="#0f1419", height=400, highlightthickness=0)
         self.map_canvas.pack(fill="both", expand=True, padx=10, pady=10)
         
+        # Replay controls: scrub through today's recorded history
+        replay_frame = ctk.CTkFrame(self, fg_color="transparent")
+        replay_frame.pack(fill="x", padx=10, pady=(0, 10))
+        
+        self.play_btn = ctk.CTkButton(replay_frame, text="▶", width=40, command=self.toggle_replay,
+                                    fg_color="#4dc4d9", hover_color="#3ba8c4")
+        self.play_btn.pack(side="left", padx=(0, 5))
+        
+        self.replay_slider = ctk.CTkSlider(replay_frame, from_=0, to=1, command=self.seek_replay)
+        self.replay_slider.set(1)
+        self.replay_slider.pack(side="left", fill="x", expand=True, padx=5)
+        
+        self.replay_label = ctk.CTkLabel(replay_frame, text="LIVE", width=70, text_color="#00ff88")
+        self.replay_label.pack(side="left", padx=5)
+        
+        live_btn = ctk.CTkButton(replay_frame, text="LIVE", width=50, command=self.go_live,
+                               fg_color="#00ff88", hover_color="#00cc6a", text_color="#1a1c2e")
+        live_btn.pack(side="left")
+        
         # Status panel
         status_frame = ctk.CTkFrame(self, fg_color="#2b2d42", height=100)
         status_frame.pack(fill="x", padx=10, pady=(0, 10))
@@ -114,10 +82,55 @@ class AdvancedGPSWidget(ctk.CTkFrame):
         self.status_labels = {}
         self.create_status_panel(status_frame)
         
-        # Initialize map
-        self.zoom_level = 1.0
-        self.center_lat = 40.7128
-        self.center_lng = -74.0060
+        # Initialize map: Web Mercator view, dragged to pan, wheel to zoom
+        self.viewport = MapViewport(40.7128, -74.0060, zoom=12)
+        self.drag_start = None
+        self.map_canvas.bind("<ButtonPress-1>", self.start_drag)
+        self.map_canvas.bind("<B1-Motion>", self.drag)
+        self.map_canvas.bind("<ButtonRelease-1>", self.end_drag)
+        self.map_canvas.bind("<MouseWheel>", self.wheel_zoom)
+        self.map_canvas.bind("<Button-4>", self.wheel_zoom)
+        self.map_canvas.bind("<Button-5>", self.wheel_zoom)
+        
+        # Raster tiles from an MBTiles file, when one is available
+        self.tiles = open_tile_layer(self.map_canvas, tile_path)
+        
+        # Trails and replay read the GPS manager's location history;
+        # replay_time None means the map shows live positions
+        self.show_trails = False
+        self.timelines = {}
+        self.trails_loaded_at = 0.0
+        self.replay_time = None
+        self.replay_range = None
+        self.playing = False
+        self.replay_speed = 60  # history seconds per wall-clock second
+        
+        # Worker threads hand updates to the Tk thread through the bridge;
+        # its single after() pump also adopts decoded tiles and plays replays
+        self.bridge = UIBridge(self)
+        self.bridge.subscribe("team_location", self.apply_team_location)
+        self.bridge.on_flush(self.update_map)
+        if self.tiles:
+            self.bridge.on_frame(self.poll_tiles)
+        self.bridge.on_frame(self.advance_replay)
+        self.bridge.start()
+        
+        # Canvas items persist between updates; static layers are redrawn
+        # only when the canvas size changes
+        self.static_size = None
+        self.markers = MarkerLayer(self.map_canvas, "team")
+        self.team_clusters = ClusterLayer(self.map_canvas, "team_cluster")
+        self.job_pins = PinLayer(self.map_canvas, "job")
+        self.job_clusters = ClusterLayer(self.map_canvas, "job_cluster", fill="#ff6b6b")
+        self.route_lines = LineLayer(self.map_canvas, "route", fill="#4dc4d9", width=2, dash=(5, 5))
+        self.trail_lines = LineLayer(self.map_canvas, "trail", fill="#ff9f43", width=2)
+        self.layers = [self.trail_lines, self.route_lines, self.job_pins, self.job_clusters,
+                       self.team_clusters, self.markers]
+        if self.tiles:
+            self.layers.insert(0, self.tiles)
+        
+        # Job pins as {"id", "lat", "lng"} dicts; see set_job_pins
+        self.jobs = []
         
         # Sample team data
         self.teams = [
@@ -125,6 +138,7 @@ class AdvancedGPSWidget(ctk.CTkFrame):
             {"id": "team_beta", "name": "Team Beta", "lat": 40.7589, "lng": -73.9851, "status": "en_route"},
             {"id": "team_gamma", "name": "Team Gamma", "lat": 40.6892, "lng": -74.0445, "status": "completed"}
         ]
+        self.teams_by_id = {team['id']: team for team in self.teams}
         
         self.update_map()
         self.start_location_updates()
@@ -162,15 +176,57 @@ class AdvancedGPSWidget(ctk.CTkFrame):
         if width <= 1 or height <= 1:
             return 0, 0
         
-        # Simple projection (not accurate for large areas)
-        x = ((lng - self.center_lng) * self.zoom_level * 1000) + width / 2
-        y = ((self.center_lat - lat) * self.zoom_level * 1000) + height / 2
-        
-        return x, y
+        return self.viewport.to_canvas(lat, lng, width, height)
+    
+    def project_many(self, lats, lngs):
+        """Vectorized lat_lng_to_canvas for arrays of coordinates"""
+        width = self.map_canvas.winfo_width()
+        height = self.map_canvas.winfo_height()
+        return self.viewport.project_many(lats, lngs, width, height)
+    
+    def zoom_in(self):
+        self.zoom_by(1)
+    
+    def zoom_out(self):
+        self.zoom_by(-1)
+    
+    def zoom_by(self, steps, anchor=None):
+        """Zoom around anchor (canvas point, default the center)"""
+        width = self.map_canvas.winfo_width()
+        height = self.map_canvas.winfo_height()
+        if self.viewport.set_zoom(self.viewport.zoom + steps, anchor, width, height):
+            self.update_map()
+    
+    def wheel_zoom(self, event):
+        # Windows/macOS report a wheel delta, X11 sends buttons 4 and 5
+        up = event.delta > 0 if getattr(event, 'delta', 0) else event.num == 4
+        self.zoom_by(1 if up else -1, (event.x, event.y))
+    
+    def start_drag(self, event):
+        self.drag_start = (event.x, event.y)
+    
+    def drag(self, event):
+        if self.drag_start is None:
+            return
+        self.viewport.pan(event.x - self.drag_start[0], event.y - self.drag_start[1])
+        self.drag_start = (event.x, event.y)
+        self.update_map()
+    
+    def end_drag(self, event):
+        self.drag_start = None
+    
+    def poll_tiles(self):
+        """Adopt tiles decoded in the background and redraw when any arrived"""
+        if self.tiles.cache.drain():
+            self.update_map()
+    
+    def set_job_pins(self, jobs):
+        """Replace the job-site pins shown on the map"""
+        self.jobs = list(jobs)
+        self.update_map()
     
     def update_map(self):
         """Update the GPS map display"""
-        self.map_canvas.delete("all")
         width = self.map_canvas.winfo_width()
         height = self.map_canvas.winfo_height()
         
@@ -178,22 +234,29 @@ class AdvancedGPSWidget(ctk.CTkFrame):
             self.after(100, self.update_map)
             return
         
-        # Draw map grid
-        grid_size = 50
-        for i in range(0, width, grid_size):
-            self.map_canvas.create_line(i, 0, i, height, fill="#2b2d42", width=1)
-        for i in range(0, height, grid_size):
-            self.map_canvas.create_line(0, i, width, i, fill="#2b2d42", width=1)
+        if self.static_size != (width, height):
+            self.draw_static_layers(width, height)
         
-        # Draw roads (simplified)
-        self.draw_roads()
-        
-        # Draw team locations
-        for team in self.teams:
-            self.draw_team_marker(team)
+        if self.tiles:
+            self.tiles.update(self.viewport, width, height)
         
-        # Draw routes
+        # Only what is inside the viewport reaches the canvas; crowded
+        # grid cells collapse into one cluster bubble
+        self.draw_trails(width, height)
         self.draw_routes()
+        self.draw_job_pins(width, height)
+        self.draw_team_markers(width, height)
+        restack(self.map_canvas, self.layers)
+    
+    def draw_static_layers(self, width, height):
+        """Grid and roads, drawn once per canvas size"""
+        self.map_canvas.delete("static")
+        draw_grid(self.map_canvas, width, height, "static")
+        # The placeholder roads are only useful without real map tiles
+        if not self.tiles:
+            self.draw_roads()
+        self.map_canvas.tag_lower("static")
+        self.static_size = (width, height)
     
     def draw_roads(self):
         """Draw simplified road network"""
@@ -210,81 +273,211 @@ class AdvancedGPSWidget(ctk.CTkFrame):
         
         for road in roads:
             self.map_canvas.create_line(road[0][0], road[0][1], road[1][0], road[1][1],
-                                      fill="#555555", width=3)
+                                      fill="#555555", width=3, tags="static")
+    
+    def draw_job_pins(self, width, height):
+        """Place visible job pins, clustered per grid cell"""
+        if self.jobs:
+            xs, ys = self.project_many([job['lat'] for job in self.jobs], [job['lng'] for job in self.jobs])
+            singles, clusters = grid_clusters(xs, ys, width, height)
+        else:
+            singles, clusters = [], []
+        
+        shown = []
+        for i in singles:
+            self.job_pins.update(self.jobs[i]['id'], xs[i], ys[i])
+            shown.append(self.jobs[i]['id'])
+        self.job_pins.sync(shown)
+        
+        for cell, x, y, count in clusters:
+            self.job_clusters.update(cell, x, y, count)
+        self.job_clusters.sync(cell for cell, _, _, _ in clusters)
+    
+    def draw_team_markers(self, width, height):
+        """Place visible team markers; nearby teams merge into clusters"""
+        teams, lats, lngs = self.team_positions()
+        if teams:
+            xs, ys = self.project_many(lats, lngs)
+            singles, clusters = grid_clusters(xs, ys, width, height, cell_px=40)
+        else:
+            singles, clusters = [], []
+        
+        shown = []
+        for i in singles:
+            team = teams[i]
+            self.markers.update(team['id'], xs[i], ys[i], team['name'], team['status'])
+            shown.append(team['id'])
+        self.markers.sync(shown)
+        
+        for cell, x, y, count in clusters:
+            self.team_clusters.update(cell, x, y, count)
+        self.team_clusters.sync(cell for cell, _, _, _ in clusters)
     
-    def draw_team_marker(self, team):
-        """Draw team marker on map"""
-        x, y = self.lat_lng_to_canvas(team['lat'], team['lng'])
+    def team_positions(self):
+        """(teams, lats, lngs) shown on the map: live, or where each team was at replay_time"""
+        if self.replay_time is None:
+            return self.teams, [team['lat'] for team in self.teams], [team['lng'] for team in self.teams]
         
-        # Ensure marker is within canvas bounds
-        width = self.map_canvas.winfo_width()
-        height = self.map_canvas.winfo_height()
+        teams, lats, lngs = [], [], []
+        for team in self.teams:
+            timeline = self.timelines.get(team['id'])
+            position = timeline.position_at(self.replay_time) if timeline else None
+            if position is not None:
+                teams.append(team)
+                lats.append(position[0])
+                lngs.append(position[1])
+        return teams, lats, lngs
+    
+    def draw_trails(self, width, height):
+        """One polyline per team, simplified to about a pixel at the current zoom"""
+        if not self.show_trails:
+            self.trail_lines.sync(())
+            return
         
-        if 0 <= x <= width and 0 <= y <= height:
-            # Status colors
-            colors = {
-                "active": "#00ff00",
-                "en_route": "#ffff00", 
-                "completed": "#4dc4d9",
-                "offline": "#ff4444"
-            }
-            
-            color = colors.get(team['status'], "#ffffff")
+        # Live trails pick up new history every few seconds
+        if self.replay_time is None and time.monotonic() - self.trails_loaded_at > 10:
+            self.load_trails()
+        
+        tolerance = km_per_pixel(self.viewport.zoom, round(self.viewport.center[0]))
+        shown = []
+        for team_id, timeline in self.timelines.items():
+            points = timeline.trail(tolerance, self.replay_time)
+            if self.replay_time is None and team_id in self.teams_by_id:
+                team = self.teams_by_id[team_id]
+                points = np.vstack([points, (team['lat'], team['lng'])])
+            if len(points) < 2:
+                continue
             
-            # Team marker
-            marker_size = 12
-            self.map_canvas.create_oval(x-marker_size, y-marker_size, 
-                                      x+marker_size, y+marker_size,
-                                      fill=color, outline="#ffffff", width=2)
+            xs, ys = self.project_many(points[:, 0], points[:, 1])
+            if xs.max() < 0 or xs.min() > width or ys.max() < 0 or ys.min() > height:
+                continue
             
-            # Team label
-            self.map_canvas.create_text(x, y-25, text=team['name'],
-                                      fill="#ffffff", font=("Arial", 10, "bold"))
-            
-            # Pulsing effect for active teams
-            if team['status'] == 'active':
-                pulse_size = 20
-                self.map_canvas.create_oval(x-pulse_size, y-pulse_size,
-                                          x+pulse_size, y+pulse_size,
-                                          outline=color, width=2)
+            self.trail_lines.update(team_id, list(zip(xs.tolist(), ys.tolist())))
+            shown.append(team_id)
+        self.trail_lines.sync(shown)
+    
+    def load_trails(self):
+        """Read today's history for every team into time-indexed timelines"""
+        since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        self.timelines = load_timelines(self.gps_manager.location_store, self.teams_by_id, since)
+        self.replay_range = replay_bounds(self.timelines)
+        self.trails_loaded_at = time.monotonic()
+    
+    def toggle_trails(self):
+        self.show_trails = not self.show_trails
+        if self.show_trails:
+            self.load_trails()
+        self.update_map()
+    
+    def seek_replay(self, value):
+        """Scrubber moved: show the fleet at that fraction of today's history"""
+        if self.replay_time is None:
+            self.load_trails()
+        if self.replay_range is None:
+            return
+        
+        start, end = self.replay_range
+        self.set_replay_time(start + float(value) * (end - start))
+    
+    def set_replay_time(self, timestamp):
+        self.replay_time = timestamp
+        self.replay_label.configure(text=datetime.fromtimestamp(timestamp).strftime("%H:%M:%S"),
+                                    text_color="#ff9f43")
+        self.update_map()
+    
+    def toggle_replay(self):
+        """Play or pause the replay from the scrubber position"""
+        if self.replay_time is None:
+            self.load_trails()
+            if self.replay_range is None:
+                return
+            self.set_replay_time(self.replay_range[0])
+        
+        self.playing = not self.playing
+        self.play_btn.configure(text="⏸" if self.playing else "▶")
+    
+    def advance_replay(self):
+        """Bridge frame callback: move a playing replay forward"""
+        if not self.playing or self.replay_range is None:
+            return
+        
+        start, end = self.replay_range
+        timestamp = min(end, self.replay_time + self.replay_speed * self.bridge.interval_ms / 1000.0)
+        if timestamp >= end:
+            self.playing = False
+            self.play_btn.configure(text="▶")
+        
+        self.replay_slider.set((timestamp - start) / (end - start) if end > start else 1)
+        self.set_replay_time(timestamp)
+    
+    def go_live(self):
+        """Leave replay and follow live positions again"""
+        self.replay_time = None
+        self.playing = False
+        self.play_btn.configure(text="▶")
+        self.replay_slider.set(1)
+        self.replay_label.configure(text="LIVE", text_color="#00ff88")
+        self.update_map()
     
     def draw_routes(self):
         """Draw optimized routes"""
-        # Sample route between teams
+        width = self.map_canvas.winfo_width()
+        height = self.map_canvas.winfo_height()
+        
+        # Sample route between teams; segments outside the view are skipped
+        segments = {}
         if len(self.teams) >= 2:
+            xs, ys = self.project_many([team['lat'] for team in self.teams],
+                                       [team['lng'] for team in self.teams])
+            xs, ys = xs.tolist(), ys.tolist()
             for i in range(len(self.teams) - 1):
-                team1 = self.teams[i]
-                team2 = self.teams[i + 1]
-                
-                x1, y1 = self.lat_lng_to_canvas(team1['lat'], team1['lng'])
-                x2, y2 = self.lat_lng_to_canvas(team2['lat'], team2['lng'])
-                
-                # Draw route line
-                self.map_canvas.create_line(x1, y1, x2, y2,
-                                          fill="#4dc4d9", width=2, dash=(5, 5))
+                if segment_visible(xs[i], ys[i], xs[i + 1], ys[i + 1], width, height):
+                    key = (self.teams[i]['id'], self.teams[i + 1]['id'])
+                    segments[key] = [(xs[i], ys[i]), (xs[i + 1], ys[i + 1])]
+        
+        for key, points in segments.items():
+            self.route_lines.update(key, points)
+        self.route_lines.sync(segments)
     
     def start_location_updates(self):
         """Start simulated location updates"""
+        # The worker keeps its own copy of the positions and only posts to
+        # the bridge; team dicts and the canvas are touched on the Tk thread
+        positions = {team['id']: (team['lat'], team['lng'], team['status']) for team in self.teams}
+        
         def update_locations():
             while True:
-                for team in self.teams:
-                    if team['status'] == 'active':
+                for team_id, (lat, lng, status) in positions.items():
+                    if status == 'active':
                         # Simulate movement
-                        team['lat'] += (hash(team['id']) % 3 - 1) * 0.001
-                        team['lng'] += (hash(team['id']) % 3 - 1) * 0.001
+                        lat += (hash(team_id) % 3 - 1) * 0.001
+                        lng += (hash(team_id) % 3 - 1) * 0.001
+                        positions[team_id] = (lat, lng, status)
+                        self.bridge.post("team_location", team_id, (lat, lng))
                 
-                # Update map on main thread
-                self.after(0, self.update_map)
                 time.sleep(2)  # Update every 2 seconds
         
         # Start update thread
         update_thread = threading.Thread(target=update_locations, daemon=True)
         update_thread.start()
+    
+    def post_team_location(self, team_id, lat, lng):
+        """Thread-safe entry point for live GPS pings"""
+        self.bridge.post("team_location", team_id, (lat, lng))
+    
+    def apply_team_location(self, team_id, position):
+        """Tk thread: store the newest position of a team"""
+        team = self.teams_by_id.get(team_id)
+        if team is not None:
+            team['lat'], team['lng'] = position
+            # Recorded so trails and replay can show where the team has been
+            self.gps_manager.update_team_location(team_id, *position)
 
 class RouteOptimizationWidget(ctk.CTkFrame):
     def __init__(self, parent, gps_manager):
         super().__init__(parent, fg_color="#1a1c2e")
         self.gps_manager = gps_manager
+        self.cards = {}
         
         # Title
         title = ctk.CTkLabel(self, text="🛣️ ROUTE OPTIMIZATION", 
@@ -311,18 +504,48 @@ class RouteOptimizationWidget(ctk.CTkFrame):
         refresh_btn.pack(side="left")
         
         self.load_routes()
+        self.refresh_etas()
     
     def load_routes(self):
         """Load current routes"""
-        # Sample routes
-        routes = [
-            {"team": "Alpha", "stops": 3, "distance": "12.5 km", "eta": "2:30 PM"},
-            {"team": "Beta", "stops": 2, "distance": "8.2 km", "eta": "1:45 PM"},
-            {"team": "Gamma", "stops": 4, "distance": "15.8 km", "eta": "3:15 PM"}
+        # Sample routes, keyed by the same team ids the GPS pings use; ETAs
+        # come from the GPS manager's ETA service
+        self.routes = [
+            {"team_id": "team_alpha", "team": "Alpha",
+             "locations": [(40.7128, -74.0060), (40.7614, -73.9776), (40.6892, -74.0445)]},
+            {"team_id": "team_beta", "team": "Beta",
+             "locations": [(40.7589, -73.9851), (40.7505, -73.9934)]},
+            {"team_id": "team_gamma", "team": "Gamma",
+             "locations": [(40.6892, -74.0445), (40.7614, -73.9776), (40.7128, -74.0060), (40.7505, -73.9934)]}
         ]
         
-        for route in routes:
-            self.create_route_card(route)
+        for route in self.routes:
+            self.create_route_card(self.route_summary(route, route['locations']))
+    
+    def route_summary(self, route, locations):
+        """Card data for a team route in the given stop order"""
+        distance = self.gps_manager.route_distance(locations)
+        estimate = self.gps_manager.plan_eta(route['team_id'], locations)
+        return {"team_id": route['team_id'], "team": route['team'], "stops": len(locations),
+                "distance": f"{distance:.1f} km", "distance_km": distance,
+                "eta": self.format_eta(estimate)}
+    
+    def format_eta(self, estimate):
+        return estimate['eta'].strftime("%I:%M %p").lstrip("0") if estimate else "--"
+    
+    def route_details(self, route):
+        return f"📍 {route['stops']} stops • 📏 {route['distance']} • ⏰ ETA: {route['eta']}"
+    
+    def refresh_etas(self):
+        """Show each team's latest ETA (recomputed by the ETA service on every ping)"""
+        eta_service = self.gps_manager.eta_service
+        for team_id, (details_label, route) in self.cards.items():
+            eta = self.format_eta(eta_service.eta(team_id))
+            if eta != route['eta']:
+                route['eta'] = eta
+                details_label.configure(text=self.route_details(route))
+        
+        self.after(1000, self.refresh_etas)
     
     def create_route_card(self, route):
         """Create route information card"""
@@ -336,44 +559,33 @@ class RouteOptimizationWidget(ctk.CTkFrame):
         header.pack(anchor="w", padx=10, pady=(5, 0))
         
         # Route details
-        details = f"📍 {route['stops']} stops • 📏 {route['distance']} • ⏰ ETA: {route['eta']}"
-        details_label = ctk.CTkLabel(card, text=details,
+        details_label = ctk.CTkLabel(card, text=self.route_details(route),
                                    font=ctk.CTkFont(size=11),
                                    text_color="#ffffff")
         details_label.pack(anchor="w", padx=10, pady=(0, 5))
+        self.cards[route['team_id']] = (details_label, route)
     
     def optimize_routes(self):
         """Optimize all routes"""
         # Clear existing routes
         for widget in self.route_frame.winfo_children():
             widget.destroy()
+        self.cards = {}
         
-        # Show optimization in progress
-        progress = ctk.CTkLabel(self.route_frame, text="🔄 Optimizing routes...",
-                              text_color="#4dc4d9")
-        progress.pack(pady=20)
-        
-        # Simulate optimization delay
-        self.after(2000, self.show_optimized_routes)
+        # Unchanged stop sets are served from the GPS manager's route cache
+        optimized = [self.route_summary(route, self.gps_manager.optimize_route(route['locations']))
+                     for route in self.routes]
+        self.show_optimized_routes(optimized)
     
-    def show_optimized_routes(self):
+    def show_optimized_routes(self, routes):
         """Show optimized routes"""
-        # Clear progress
-        for widget in self.route_frame.winfo_children():
-            widget.destroy()
-        
-        # Optimized routes (improved)
-        routes = [
-            {"team": "Alpha", "stops": 3, "distance": "10.2 km", "eta": "2:15 PM"},
-            {"team": "Beta", "stops": 2, "distance": "7.1 km", "eta": "1:30 PM"},
-            {"team": "Gamma", "stops": 4, "distance": "13.5 km", "eta": "2:45 PM"}
-        ]
-        
         for route in routes:
             self.create_route_card(route)
         
         # Show savings
-        savings = ctk.CTkLabel(self.route_frame, text="✅ Routes optimized! Saved 4.2 km total distance",
+        before = sum(self.gps_manager.route_distance(route['locations']) for route in self.routes)
+        after = sum(route['distance_km'] for route in routes)
+        savings = ctk.CTkLabel(self.route_frame, text=f"✅ Routes optimized! Saved {before - after:.1f} km total distance",
                              font=ctk.CTkFont(size=12, weight="bold"),
                              text_color="#00ff88")
         savings.pack(pady=10)
@@ -0,0 +1,129 @@
+"""
+GPS Manager
+Geocoding, route ordering and team tracking shared by the GPS widgets and headless tools
+"""
+
+from datetime import datetime
+from route_cache import RouteCache
+from spatial_index import GridIndex
+from geocoding import GeocodingService
+from location_store import LocationStore
+from geofence import GeofenceEngine, JobSiteFences
+from eta_service import ETAService
+import geo_utils
+
+class GPSManager:
+    DEFAULT_COORDINATES = (40.7128, -74.0060)
+    
+    def __init__(self, route_cache=None, geocoder=None, location_store=None, geofences=None,
+                 eta_service=None):
+        self.api_key = "demo_key"  # Replace with actual API key
+        self.team_locations = {}
+        self.routes = {}
+        self.route_cache = route_cache or RouteCache()
+        # In production, pass GeocodingService(GoogleGeocoder(api_key), ...)
+        self.geocoder = geocoder or GeocodingService()
+        self.location_store = location_store or LocationStore()
+        self.geofences = geofences or GeofenceEngine()
+        self.eta_service = eta_service or ETAService()
+        self.job_sites = None
+        
+    def get_coordinates(self, address):
+        """Convert address to GPS coordinates"""
+        coords = self.geocoder.resolve(address)
+        return coords if coords is not None else self.DEFAULT_COORDINATES
+    
+    def get_coordinates_bulk(self, addresses):
+        """Coordinates for many addresses in order; each miss reaches the backend once"""
+        resolved = self.geocoder.resolve_many(addresses)
+        return [resolved[address] if resolved[address] is not None else self.DEFAULT_COORDINATES
+                for address in addresses]
+    
+    def calculate_distance(self, coord1, coord2):
+        """Calculate distance between two coordinates"""
+        return geo_utils.haversine_distance(coord1, coord2)
+    
+    def distances_from(self, origin, locations):
+        """Distances (km) from one coordinate to many, as a NumPy array"""
+        return geo_utils.one_to_many(origin, locations)
+    
+    def distance_matrix(self, origins, destinations=None, **kwargs):
+        """Many-to-many distances (km); see geo_utils.distance_matrix for chunking options"""
+        return geo_utils.distance_matrix(origins, destinations, **kwargs)
+    
+    def optimize_route(self, locations):
+        """Optimize route for multiple locations"""
+        if len(locations) <= 2:
+            return locations
+        
+        # The tour always starts at the first stop, so it is part of the key
+        constraints = {'method': 'nearest_neighbor',
+                       'start': self.route_cache.canonical_point(locations[0])}
+        cached = self.route_cache.get(locations, constraints)
+        if cached is not None:
+            route, _ = cached
+            return [locations[i] for i in route]
+        
+        # Nearest neighbor tour; a grid index answers each "closest remaining
+        # stop" query without scanning every stop
+        index = GridIndex({i: locations[i] for i in range(1, len(locations))})
+        route = [0]
+        
+        while len(index):
+            current = locations[route[-1]]
+            nearest = index.nearest(current[0], current[1])
+            route.append(nearest)
+            index.remove(nearest)
+        
+        optimized = [locations[i] for i in route]
+        self.route_cache.put(locations, constraints, route, self.route_distance(optimized))
+        
+        return optimized
+    
+    def route_distance(self, locations):
+        """Total distance along locations in the given order"""
+        if len(locations) < 2:
+            return 0.0
+        return float(geo_utils.path_lengths(locations).sum())
+    
+    def update_team_location(self, team_id, lat, lng):
+        """Update team location; returns any geofence arrival/departure events"""
+        timestamp = datetime.now()
+        self.team_locations[team_id] = {
+            'lat': lat,
+            'lng': lng,
+            'timestamp': timestamp,
+            'status': 'active'
+        }
+        self.location_store.append(team_id, lat, lng, timestamp.timestamp())
+        self.eta_service.update(team_id, lat, lng, timestamp.timestamp())
+        return self.geofences.check(team_id, lat, lng, timestamp.isoformat())
+    
+    def watch_job_sites(self, db_manager):
+        """Fence every active job from the jobs table; returns the JobSiteFences"""
+        self.job_sites = JobSiteFences(self.geofences, db_manager, self.geocoder)
+        print(f"Job-site geofences: {self.job_sites.load()} active jobs")
+        return self.job_sites
+    
+    def plan_eta(self, team_id, stops):
+        """Set a team's remaining stops and estimate from its last known position"""
+        speed_model = self.eta_service.speed_model
+        if team_id not in speed_model.last_ping:
+            # First route for this team: learn its speeds from stored history
+            speed_model.fit(team_id, self.location_store.history(team_id))
+        
+        self.eta_service.set_route(team_id, stops)
+        if not stops:
+            return None
+        
+        location = self.team_locations.get(team_id)
+        lat, lng = (location['lat'], location['lng']) if location else stops[0]
+        return self.eta_service.estimate(team_id, lat, lng)
+    
+    def close(self):
+        """Persist buffered pings; call when the application shuts down"""
+        self.location_store.close()
+    
+    def team_track(self, team_id, tolerance_km=0.01, since=None, until=None):
+        """Downsampled (timestamp, lat, lng) history of a team for playback"""
+        return self.location_store.playback(team_id, tolerance_km, since, until)
@@ -0,0 +1,139 @@
+"""
+Location Store
+Append-only team location history: in-memory ring buffers with periodic SQLite flush
+"""
+
+import bisect
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import geo_utils
+
+class LocationStore:
+    """Per-team ring buffers of (timestamp, lat, lng) pings
+
+    Appends only touch a deque and a pending list, so thousands of pings per
+    second stay cheap. Pending pings are written to SQLite in one batch every
+    flush_interval seconds; owners call flush_if_due() from a timer so a team
+    that goes quiet is still persisted, and close() on shutdown. With
+    path=None the store is memory only and the ring buffers hold the most
+    recent capacity pings per team.
+    """
+
+    def __init__(self, path=None, capacity=10000, flush_interval=5.0):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.buffers = {}
+        self.pending = []
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.conn = None
+
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS locations (
+                    team_id TEXT,
+                    ts REAL,
+                    lat REAL,
+                    lng REAL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_locations_team_ts ON locations (team_id, ts)")
+            self.conn.commit()
+
+    def append(self, team_id, lat, lng, timestamp=None):
+        """Record one ping (timestamp in epoch seconds, defaults to now)"""
+        if timestamp is None:
+            timestamp = time.time()
+        ping = (timestamp, lat, lng)
+
+        with self.lock:
+            buffer = self.buffers.get(team_id)
+            if buffer is None:
+                buffer = self.buffers[team_id] = deque(maxlen=self.capacity)
+            buffer.append(ping)
+
+            if self.conn is not None:
+                self.pending.append((str(team_id), timestamp, lat, lng))
+
+        self.flush_if_due()
+
+    def flush_if_due(self):
+        """Flush when pings are pending and flush_interval has passed (cheap to poll)"""
+        if self.conn is not None and self.pending and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write pending pings to SQLite in one transaction"""
+        with self.lock:
+            rows, self.pending = self.pending, []
+            self.last_flush = time.monotonic()
+
+        if not rows or self.conn is None:
+            return
+
+        try:
+            with self.lock:
+                self.conn.executemany("INSERT INTO locations (team_id, ts, lat, lng) VALUES (?, ?, ?, ?)", rows)
+                self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Location store flush error: {e}")
+
+    def latest(self, team_id):
+        """Most recent (timestamp, lat, lng) for a team, or None"""
+        buffer = self.buffers.get(team_id)
+        return buffer[-1] if buffer else None
+
+    def recent(self, team_id, since=None, until=None):
+        """Buffered pings for a team between since and until (epoch seconds)"""
+        with self.lock:
+            pings = list(self.buffers.get(team_id, ()))
+
+        # Pings arrive in time order, so the window is found by bisection
+        start = bisect.bisect_left(pings, (since,)) if since is not None else 0
+        end = bisect.bisect_right(pings, (until, float('inf'))) if until is not None else len(pings)
+        return pings[start:end]
+
+    def history(self, team_id, since=None, until=None):
+        """Full persisted history for a team, falling back to the ring buffer"""
+        if self.conn is None:
+            return self.recent(team_id, since, until)
+
+        self.flush()
+
+        query = "SELECT ts, lat, lng FROM locations WHERE team_id = ?"
+        params = [str(team_id)]
+        if since is not None:
+            query += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND ts <= ?"
+            params.append(until)
+
+        with self.lock:
+            return self.conn.execute(query + " ORDER BY ts", params).fetchall()
+
+    def playback(self, team_id, tolerance_km=0.01, since=None, until=None):
+        """History simplified with Douglas-Peucker for drawing and replay"""
+        pings = self.history(team_id, since, until)
+        if len(pings) < 3:
+            return pings
+
+        keep = geo_utils.douglas_peucker([(lat, lng) for _, lat, lng in pings], tolerance_km)
+        return [pings[i] for i in keep]
+
+    def close(self):
+        """Flush and release the database"""
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,252 @@
+"""
+Map Layers
+Persistent canvas items for the GPS map widgets, updated in place instead of redrawn
+"""
+
+import math
+
+import numpy as np
+
+STATUS_COLORS = {
+    "active": "#00ff00",
+    "en_route": "#ffff00",
+    "completed": "#4dc4d9",
+    "offline": "#ff4444"
+}
+
+def grid_clusters(xs, ys, width, height, cell_px=48, margin=24):
+    """Cull screen points to the viewport and bucket them into cell_px cells
+
+    Returns (singles, clusters): singles are indices of points alone in their
+    cell, clusters are (cell_key, x, y, count) at the members' centroid.
+    Cells are fixed in screen pixels, so clusters split apart as the map
+    zooms in and the number of drawn items never exceeds the cell count.
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    visible = np.flatnonzero((xs >= -margin) & (xs <= width + margin) &
+                             (ys >= -margin) & (ys <= height + margin))
+    if not len(visible):
+        return visible, []
+
+    cell_x = np.floor((xs[visible] + margin) / cell_px).astype(np.int64)
+    cell_y = np.floor((ys[visible] + margin) / cell_px).astype(np.int64)
+    rows = (height + 2 * margin) // cell_px + 1
+    keys = cell_x * rows + cell_y
+
+    cells, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    singles = visible[counts[inverse] == 1]
+
+    sum_x = np.bincount(inverse, weights=xs[visible])
+    sum_y = np.bincount(inverse, weights=ys[visible])
+    clusters = [(int(cells[k]), sum_x[k] / counts[k], sum_y[k] / counts[k], int(counts[k]))
+                for k in np.flatnonzero(counts > 1)]
+    return singles, clusters
+
+def segment_visible(x1, y1, x2, y2, width, height):
+    """True if the segment's bounding box overlaps the viewport"""
+    return not (max(x1, x2) < 0 or min(x1, x2) > width or max(y1, y2) < 0 or min(y1, y2) > height)
+
+def restack(canvas, layers):
+    """Keep layers (listed bottom to top) stacked after new items were created
+
+    Tk puts new items on top, so when a layer created items every layer
+    above it is raised again. Frames that create nothing make no calls.
+    """
+    raise_rest = False
+    for layer in layers:
+        if raise_rest:
+            canvas.tag_raise(layer.tag)
+        raise_rest = raise_rest or layer.created
+        layer.created = False
+
+def draw_grid(canvas, width, height, tag, spacing=50, color="#2b2d42"):
+    """Background grid as one tagged group of lines"""
+    for i in range(0, width, spacing):
+        canvas.create_line(i, 0, i, height, fill=color, width=1, tags=tag)
+    for i in range(0, height, spacing):
+        canvas.create_line(0, i, width, i, fill=color, width=1, tags=tag)
+
+class MarkerLayer:
+    """Keyed team markers that live on the canvas between frames
+
+    update() creates a marker the first time a key is seen and afterwards
+    only touches the canvas when its position or status actually changed,
+    moving the existing items with coords(). Keys left out of sync() are
+    deleted.
+    """
+
+    def __init__(self, canvas, tag, radius=12, pulse_radius=20, label_offset=25,
+                 font=("Arial", 10, "bold")):
+        self.canvas = canvas
+        self.tag = tag
+        self.radius = radius
+        self.pulse_radius = pulse_radius
+        self.label_offset = label_offset
+        self.font = font
+        self.markers = {}
+        self.created = False
+
+    def update(self, key, x, y, name, status):
+        marker = self.markers.get(key)
+        if marker is None:
+            marker = self.create(key, name)
+
+        if marker['pos'] != (x, y):
+            r, p = self.radius, self.pulse_radius
+            self.canvas.coords(marker['dot'], x - r, y - r, x + r, y + r)
+            self.canvas.coords(marker['pulse'], x - p, y - p, x + p, y + p)
+            self.canvas.coords(marker['label'], x, y - self.label_offset)
+            marker['pos'] = (x, y)
+
+        if marker['status'] != status:
+            color = STATUS_COLORS.get(status, "#ffffff")
+            self.canvas.itemconfigure(marker['dot'], fill=color)
+            # Pulsing ring only for active teams
+            self.canvas.itemconfigure(marker['pulse'], outline=color,
+                                      state="normal" if status == "active" else "hidden")
+            marker['status'] = status
+
+        if marker['name'] != name:
+            self.canvas.itemconfigure(marker['label'], text=name)
+            marker['name'] = name
+
+    def create(self, key, name):
+        marker = {
+            'dot': self.canvas.create_oval(0, 0, 0, 0, outline="#ffffff", width=2, tags=self.tag),
+            'pulse': self.canvas.create_oval(0, 0, 0, 0, width=2, state="hidden", tags=self.tag),
+            'label': self.canvas.create_text(0, 0, text=name, fill="#ffffff", font=self.font, tags=self.tag),
+            'pos': None,
+            'status': None,
+            'name': name
+        }
+        self.markers[key] = marker
+        self.created = True
+        return marker
+
+    def remove(self, key):
+        marker = self.markers.pop(key, None)
+        if marker is not None:
+            for item in (marker['dot'], marker['pulse'], marker['label']):
+                self.canvas.delete(item)
+
+    def sync(self, keys):
+        """Delete markers whose key is no longer shown"""
+        for key in set(self.markers) - set(keys):
+            self.remove(key)
+
+class LineLayer:
+    """Keyed polylines updated with coords() only when their points change"""
+
+    def __init__(self, canvas, tag, **style):
+        self.canvas = canvas
+        self.tag = tag
+        self.style = style
+        self.lines = {}
+        self.created = False
+
+    def update(self, key, points):
+        flat = [value for point in points for value in point]
+        line = self.lines.get(key)
+
+        if line is None:
+            # Tk needs at least two points to create a line
+            item = self.canvas.create_line(*(flat if len(flat) >= 4 else (0, 0, 0, 0)),
+                                           tags=self.tag, **self.style)
+            line = self.lines[key] = {'item': item, 'flat': None}
+            self.created = True
+
+        if line['flat'] != flat:
+            if len(flat) >= 4:
+                self.canvas.coords(line['item'], *flat)
+                self.canvas.itemconfigure(line['item'], state="normal")
+            else:
+                self.canvas.itemconfigure(line['item'], state="hidden")
+            line['flat'] = flat
+
+    def remove(self, key):
+        line = self.lines.pop(key, None)
+        if line is not None:
+            self.canvas.delete(line['item'])
+
+    def sync(self, keys):
+        for key in set(self.lines) - set(keys):
+            self.remove(key)
+
+class PinLayer:
+    """Keyed small square pins (job sites) moved with coords()"""
+
+    def __init__(self, canvas, tag, size=4, fill="#ff6b6b"):
+        self.canvas = canvas
+        self.tag = tag
+        self.size = size
+        self.fill = fill
+        self.pins = {}
+        self.created = False
+
+    def update(self, key, x, y):
+        pin = self.pins.get(key)
+        if pin is None:
+            item = self.canvas.create_rectangle(0, 0, 0, 0, fill=self.fill, outline="", tags=self.tag)
+            pin = self.pins[key] = {'item': item, 'pos': None}
+            self.created = True
+
+        if pin['pos'] != (x, y):
+            s = self.size
+            self.canvas.coords(pin['item'], x - s, y - s, x + s, y + s)
+            pin['pos'] = (x, y)
+
+    def remove(self, key):
+        pin = self.pins.pop(key, None)
+        if pin is not None:
+            self.canvas.delete(pin['item'])
+
+    def sync(self, keys):
+        for key in set(self.pins) - set(keys):
+            self.remove(key)
+
+class ClusterLayer:
+    """Keyed cluster bubbles showing how many points share a grid cell"""
+
+    def __init__(self, canvas, tag, fill="#4dc4d9", min_radius=10, max_radius=24):
+        self.canvas = canvas
+        self.tag = tag
+        self.fill = fill
+        self.min_radius = min_radius
+        self.max_radius = max_radius
+        self.clusters = {}
+        self.created = False
+
+    def update(self, key, x, y, count):
+        cluster = self.clusters.get(key)
+        if cluster is None:
+            cluster = self.clusters[key] = {
+                'bubble': self.canvas.create_oval(0, 0, 0, 0, fill=self.fill, outline="#ffffff",
+                                                  width=1, tags=self.tag),
+                'label': self.canvas.create_text(0, 0, fill="#0f1419", font=("Arial", 9, "bold"),
+                                                 tags=self.tag),
+                'pos': None,
+                'count': None
+            }
+            self.created = True
+
+        if cluster['pos'] != (x, y) or cluster['count'] != count:
+            # Bubble grows with the log of the member count
+            r = min(self.max_radius, self.min_radius + 3 * math.log10(count))
+            self.canvas.coords(cluster['bubble'], x - r, y - r, x + r, y + r)
+            self.canvas.coords(cluster['label'], x, y)
+            cluster['pos'] = (x, y)
+
+        if cluster['count'] != count:
+            self.canvas.itemconfigure(cluster['label'], text=str(count))
+            cluster['count'] = count
+
+    def remove(self, key):
+        cluster = self.clusters.pop(key, None)
+        if cluster is not None:
+            self.canvas.delete(cluster['bubble'])
+            self.canvas.delete(cluster['label'])
+
+    def sync(self, keys):
+        for key in set(self.clusters) - set(keys):
+            self.remove(key)
@@ -0,0 +1,110 @@
+"""
+Map Projection
+Web Mercator viewport shared by the desktop map widgets: zoom, pan and tile grid math
+"""
+
+import math
+
+import numpy as np
+
+TILE_SIZE = 256
+MIN_ZOOM = 3
+MAX_ZOOM = 19
+MAX_LATITUDE = 85.05112878
+
+class MapViewport:
+    """Web Mercator (EPSG:3857) view: a center, an integer zoom and a pixel size
+
+    World pixel coordinates at zoom z span TILE_SIZE * 2**z, the same grid
+    slippy-map tiles use, so markers and raster tiles always line up.
+    """
+
+    def __init__(self, center_lat, center_lng, zoom=12, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.zoom = max(min_zoom, min(max_zoom, int(zoom)))
+        x, y = self.to_world(center_lat, center_lng)
+        self.center_x, self.center_y = float(x), float(y)
+
+    def world_size(self):
+        return TILE_SIZE * (2 ** self.zoom)
+
+    def to_world(self, lat, lng):
+        """World pixel coordinates at the current zoom; accepts scalars or arrays"""
+        lat = np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE)
+        size = self.world_size()
+        x = (np.asarray(lng, dtype=float) + 180.0) / 360.0 * size
+        sin_lat = np.sin(np.radians(lat))
+        y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * size
+        return x, y
+
+    def to_lat_lng(self, x, y):
+        """Inverse of to_world"""
+        size = self.world_size()
+        lng = x / size * 360.0 - 180.0
+        lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / size))))
+        return lat, lng
+
+    @property
+    def center(self):
+        return self.to_lat_lng(self.center_x, self.center_y)
+
+    def project_many(self, lats, lngs, width, height):
+        """Canvas coordinates for arrays of (lat, lng)"""
+        x, y = self.to_world(lats, lngs)
+        return x - self.center_x + width / 2, y - self.center_y + height / 2
+
+    def to_canvas(self, lat, lng, width, height):
+        x, y = self.project_many(lat, lng, width, height)
+        return float(x), float(y)
+
+    def pan(self, dx, dy):
+        """Move the view by a drag of (dx, dy) canvas pixels"""
+        self.center_x -= dx
+        self.center_y -= dy
+
+    def set_zoom(self, zoom, anchor=None, width=0, height=0):
+        """Change zoom, keeping the canvas point anchor (default the center) fixed"""
+        zoom = max(self.min_zoom, min(self.max_zoom, int(zoom)))
+        if zoom == self.zoom:
+            return False
+
+        if anchor is None:
+            anchor = (width / 2, height / 2)
+        ax = self.center_x + anchor[0] - width / 2
+        ay = self.center_y + anchor[1] - height / 2
+
+        scale = 2.0 ** (zoom - self.zoom)
+        self.center_x = ax * scale - (anchor[0] - width / 2)
+        self.center_y = ay * scale - (anchor[1] - height / 2)
+        self.zoom = zoom
+        return True
+
+    def visible_tiles(self, width, height):
+        """(z, x, y, canvas_left, canvas_top) for every tile touching the view
+
+        x is not wrapped, so copies of a tile across the antimeridian stay
+        distinct; use tile_key() for the stored tile.
+        """
+        tiles_per_side = 2 ** self.zoom
+        left = self.center_x - width / 2
+        top = self.center_y - height / 2
+
+        first_x = int(math.floor(left / TILE_SIZE))
+        first_y = max(0, int(math.floor(top / TILE_SIZE)))
+        last_x = int(math.floor((left + width) / TILE_SIZE))
+        last_y = min(tiles_per_side - 1, int(math.floor((top + height) / TILE_SIZE)))
+
+        tiles = []
+        for ty in range(first_y, last_y + 1):
+            for tx in range(first_x, last_x + 1):
+                tiles.append((self.zoom, tx, ty, tx * TILE_SIZE - left, ty * TILE_SIZE - top))
+        return tiles
+
+def tile_key(z, x, y):
+    """Stored tile for a possibly unwrapped tile column"""
+    return (z, x % (2 ** z), y)
+
+def km_per_pixel(zoom, lat):
+    """Ground distance covered by one pixel at this zoom and latitude"""
+    return 40075.016686 * math.cos(math.radians(lat)) / (TILE_SIZE * (2 ** zoom))
@@ -0,0 +1,157 @@
+"""
+Map Tiles
+MBTiles raster tile layer with an in-memory LRU and background decoding
+"""
+
+import io
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageTk
+
+from map_projection import tile_key
+
+class MBTilesSource:
+    """Raw tile bytes from an MBTiles (SQLite) file
+
+    MBTiles rows use TMS numbering, so y is flipped. Each thread gets its
+    own connection because SQLite connections are not shareable.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return conn
+
+    def read(self, z, x, y):
+        row = self.connection().execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, (2 ** z) - 1 - y)
+        ).fetchone()
+        return row[0] if row else None
+
+class TileCache:
+    """Decoded tiles: a memory LRU in front of the MBTiles file on disk
+
+    Reading and PNG/JPEG decoding run on a worker thread; the Tk thread only
+    wraps finished images in a PhotoImage when it drains the result queue.
+    """
+
+    def __init__(self, source, max_tiles=256):
+        self.source = source
+        self.max_tiles = max_tiles
+        self.images = OrderedDict()
+        self.requested = set()
+        self.missing = set()
+        self.requests = queue.LifoQueue()
+        self.results = queue.Queue()
+        self.wanted_zoom = None
+
+        worker = threading.Thread(target=self.decode_loop, daemon=True)
+        worker.start()
+
+    def get(self, key):
+        """PhotoImage for a (z, x, y) key, or None (and a load request) if not ready"""
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            return image
+
+        if key not in self.requested and key not in self.missing:
+            self.requested.add(key)
+            self.requests.put(key)
+        return None
+
+    def decode_loop(self):
+        while True:
+            key = self.requests.get()
+            # Skip tiles for a zoom level the user has already left
+            if self.wanted_zoom is not None and key[0] != self.wanted_zoom:
+                self.results.put((key, None, False))
+                continue
+
+            try:
+                data = self.source.read(*key)
+                if data is None:
+                    self.results.put((key, None, True))
+                    continue
+                image = Image.open(io.BytesIO(data)).convert("RGBA")
+                image.load()
+            except Exception as e:
+                print(f"Tile decode error {key}: {e}")
+                self.results.put((key, None, True))
+                continue
+            self.results.put((key, image, False))
+
+    def drain(self, limit=16):
+        """Tk thread: adopt up to limit decoded tiles; returns how many arrived"""
+        arrived = 0
+        while arrived < limit:
+            try:
+                key, image, missing = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.requested.discard(key)
+            if missing:
+                self.missing.add(key)
+            if image is None:
+                continue
+
+            self.images[key] = ImageTk.PhotoImage(image)
+            self.images.move_to_end(key)
+            while len(self.images) > self.max_tiles:
+                self.images.popitem(last=False)
+            arrived += 1
+        return arrived
+
+    def pending(self):
+        return bool(self.requested)
+
+class TileLayer:
+    """Canvas image items for the visible tiles, reused while they stay in view"""
+
+    def __init__(self, canvas, cache, tag="tile"):
+        self.canvas = canvas
+        self.cache = cache
+        self.tag = tag
+        self.items = {}
+        self.created = False
+
+    def update(self, viewport, width, height):
+        self.cache.wanted_zoom = viewport.zoom
+        shown = set()
+
+        for z, x, y, left, top in viewport.visible_tiles(width, height):
+            image = self.cache.get(tile_key(z, x, y))
+            if image is None:
+                continue
+
+            key = (z, x, y)
+            shown.add(key)
+            tile = self.items.get(key)
+            if tile is None:
+                item = self.canvas.create_image(left, top, image=image, anchor="nw", tags=self.tag)
+                # Holding the PhotoImage keeps it alive after LRU eviction
+                tile = self.items[key] = {'item': item, 'image': image, 'pos': (left, top)}
+                self.created = True
+            elif tile['pos'] != (left, top):
+                self.canvas.coords(tile['item'], left, top)
+                tile['pos'] = (left, top)
+
+        for key in set(self.items) - shown:
+            self.canvas.delete(self.items.pop(key)['item'])
+
+def open_tile_layer(canvas, path, max_tiles=256):
+    """TileLayer over an MBTiles file, or None when the file is missing"""
+    if not path or not os.path.exists(path):
+        return None
+    return TileLayer(canvas, TileCache(MBTilesSource(path), max_tiles))
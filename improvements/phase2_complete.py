@@ -28,6 +28,9 @@ import websockets
 sys.path.append(r"C:\Users\Tewedros\Desktop\teddy_cleaning_app_v2")
 from database.db_manager import DatabaseManager
 from gps_integration import AdvancedGPSWidget, RouteOptimizationWidget, GPSManager
+from route_cache import RouteCache, CACHE_DIR
+from geocoding import GeocodingService, GeocodeCache
+from location_store import LocationStore
 
 class AIAnalyticsWidget(ctk.CTkFrame):
     def __init__(self, parent):
@@ -291,7 +294,12 @@ class CompleteOperationsCenter(ctk.CTk):
         # Initialize systems
         self.db_manager = DatabaseManager()
         self.db_manager.initialize_database()
-        self.gps_manager = GPSManager()
+        self.gps_manager = GPSManager(
+            route_cache=RouteCache(path=os.path.join(CACHE_DIR, "gps_routes.json")),
+            geocoder=GeocodingService(cache=GeocodeCache(path=os.path.join(CACHE_DIR, "geocode_cache.db"))),
+            location_store=LocationStore(path=os.path.join(CACHE_DIR, "locations.db"))
+        )
+        self.gps_manager.watch_job_sites(self.db_manager)
         
         # Window setup
         self.title("Teddy's Cleaning - Complete Operations Center")
@@ -303,6 +311,19 @@ class CompleteOperationsCenter(ctk.CTk):
         self.setup_background()
         self.setup_ui()
         self.start_systems()
+        
+        # Pings of quiet teams still reach disk; the rest is flushed on exit
+        self.flush_locations()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def flush_locations(self):
+        self.gps_manager.location_store.flush_if_due()
+        self.after(1000, self.flush_locations)
+    
+    def on_close(self):
+        """Persist buffered GPS history before the window goes away"""
+        self.gps_manager.close()
+        self.destroy()
     
     def setup_background(self):
         """Setup animated particle background"""
@@ -437,7 +458,8 @@ class CompleteOperationsCenter(ctk.CTk):
     def setup_gps_tab(self, tab):
         """Setup GPS and routing tab"""
         # GPS Map
-        self.gps_widget = AdvancedGPSWidget(tab, self.gps_manager)
+        self.gps_widget = AdvancedGPSWidget(tab, self.gps_manager,
+                                            tile_path=os.path.join(CACHE_DIR, "map.mbtiles"))
         self.gps_widget.pack(side="left", fill="both", expand=True, padx=(0, 10))
         
         # Route optimization
@@ -19,6 +19,11 @@ import os
 # Add database path
 sys.path.append(r"C:\Users\Tewedros\Desktop\teddy_cleaning_app_v2")
 from database.db_manager import DatabaseManager
+from map_layers import MarkerLayer, ClusterLayer, LineLayer, draw_grid, grid_clusters, restack
+from map_projection import MapViewport, km_per_pixel
+from track_replay import load_timelines
+from location_store import LocationStore
+from route_cache import CACHE_DIR
 
 class ParticleSystem:
     def __init__(self, canvas, width, height):
@@ -56,8 +61,9 @@ class ParticleSystem:
             )
 
 class GPSMapWidget(ctk.CTkFrame):
-    def __init__(self, parent):
+    def __init__(self, parent, location_store=None):
         super().__init__(parent, fg_color="#1a1c2e")
+        self.location_store = location_store
         
         # Title
         title = ctk.CTkLabel(self, text="🗺️ LIVE GPS TRACKING", 
@@ -69,17 +75,34 @@ class GPSMapWidget(ctk.CTkFrame):
         self.map_canvas = tk.Canvas(self, bg="#0f1419", height=300, highlightthickness=0)
         self.map_canvas.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Team locations (simulated)
+        # Team locations (simulated); ids match the ones GPS pings are stored under
         self.team_locations = [
-            {"name": "Team Alpha", "lat": 40.7128, "lng": -74.0060, "status": "active"},
-            {"name": "Team Beta", "lat": 40.7589, "lng": -73.9851, "status": "en_route"},
-            {"name": "Team Gamma", "lat": 40.6892, "lng": -74.0445, "status": "completed"}
+            {"id": "team_alpha", "name": "Team Alpha", "lat": 40.7128, "lng": -74.0060, "status": "active"},
+            {"id": "team_beta", "name": "Team Beta", "lat": 40.7589, "lng": -73.9851, "status": "en_route"},
+            {"id": "team_gamma", "name": "Team Gamma", "lat": 40.6892, "lng": -74.0445, "status": "completed"}
         ]
         
+        # Map view centered on the fleet
+        self.viewport = MapViewport(40.7128, -74.0060, zoom=11)
+        
+        # Persistent canvas items; the grid is redrawn only on resize
+        self.grid_size = None
+        self.markers = MarkerLayer(self.map_canvas, "team", radius=8, pulse_radius=15,
+                                   label_offset=20, font=("Arial", 10))
+        self.clusters = ClusterLayer(self.map_canvas, "team_cluster")
+        
+        # Trails of where each team has been, when a location store is given
+        self.trail_lines = LineLayer(self.map_canvas, "trail", fill="#ff9f43", width=2)
+        self.timelines = {}
+        self.trails_loaded_at = 0.0
+        
         self.update_map()
+    
+    def project_many(self, lats, lngs, width, height):
+        """Canvas coordinates for arrays of GPS coordinates"""
+        return self.viewport.project_many(lats, lngs, width, height)
         
     def update_map(self):
-        self.map_canvas.delete("all")
         width = self.map_canvas.winfo_width()
         height = self.map_canvas.winfo_height()
         
@@ -88,25 +111,57 @@ class GPSMapWidget(ctk.CTkFrame):
             return
         
         # Draw grid
-        for i in range(0, width, 50):
-            self.map_canvas.create_line(i, 0, i, height, fill="#2b2d42", width=1)
-        for i in range(0, height, 50):
-            self.map_canvas.create_line(0, i, width, i, fill="#2b2d42", width=1)
-        
-        # Draw team locations
-        for i, team in enumerate(self.team_locations):
-            x = (i + 1) * width // (len(self.team_locations) + 1)
-            y = height // 2 + random.randint(-50, 50)
-            
-            color = {"active": "#00ff00", "en_route": "#ffff00", "completed": "#4dc4d9"}[team["status"]]
-            
-            # Team marker
-            self.map_canvas.create_oval(x-8, y-8, x+8, y+8, fill=color, outline="#ffffff", width=2)
-            self.map_canvas.create_text(x, y-20, text=team["name"], fill="#ffffff", font=("Arial", 10))
-            
-            # Pulsing effect for active teams
-            if team["status"] == "active":
-                self.map_canvas.create_oval(x-15, y-15, x+15, y+15, outline=color, width=2)
+        if self.grid_size != (width, height):
+            self.map_canvas.delete("grid")
+            draw_grid(self.map_canvas, width, height, "grid")
+            self.map_canvas.tag_lower("grid")
+            self.grid_size = (width, height)
+        
+        # Draw team locations: off-screen teams are culled and crowded
+        # grid cells become a single cluster bubble
+        if self.team_locations:
+            xs, ys = self.project_many([team["lat"] for team in self.team_locations],
+                                       [team["lng"] for team in self.team_locations], width, height)
+            singles, clusters = grid_clusters(xs, ys, width, height, cell_px=32)
+        else:
+            singles, clusters = [], []
+        
+        shown = []
+        for i in singles:
+            team = self.team_locations[i]
+            self.markers.update(team["name"], xs[i], ys[i], team["name"], team["status"])
+            shown.append(team["name"])
+        self.markers.sync(shown)
+        
+        for cell, x, y, count in clusters:
+            self.clusters.update(cell, x, y, count)
+        self.clusters.sync(cell for cell, _, _, _ in clusters)
+        
+        self.draw_trails(width, height)
+        restack(self.map_canvas, [self.trail_lines, self.clusters, self.markers])
+    
+    def draw_trails(self, width, height):
+        """Today's track per team as one simplified polyline"""
+        if self.location_store is None:
+            return
+        
+        # The map refreshes at 10 Hz; history is re-read every few seconds
+        if time.monotonic() - self.trails_loaded_at > 10:
+            since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+            self.timelines = load_timelines(self.location_store,
+                                            [team["id"] for team in self.team_locations], since)
+            self.trails_loaded_at = time.monotonic()
+        
+        tolerance = km_per_pixel(self.viewport.zoom, round(self.viewport.center[0]))
+        shown = []
+        for team_id, timeline in self.timelines.items():
+            points = timeline.trail(tolerance)
+            if len(points) < 2:
+                continue
+            xs, ys = self.project_many(points[:, 0], points[:, 1], width, height)
+            self.trail_lines.update(team_id, list(zip(xs.tolist(), ys.tolist())))
+            shown.append(team_id)
+        self.trail_lines.sync(shown)
 
 class LiveKPIWidget(ctk.CTkFrame):
     def __init__(self, parent, title, value, unit="", color="#4dc4d9"):
@@ -299,6 +354,12 @@ class LiveOperationsCenter(ctk.CTk):
         
         # Bind resize event
         self.bind("<Configure>", self.on_resize)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def on_close(self):
+        """Release the location history database before the window goes away"""
+        self.gps_widget.location_store.close()
+        self.destroy()
     
     def on_resize(self, event):
         if event.widget == self:
@@ -378,7 +439,9 @@ class LiveOperationsCenter(ctk.CTk):
         self.kpi_widgets['clients'].pack(side="left", fill="x", expand=True)
         
         # GPS Map
-        self.gps_widget = GPSMapWidget(left_panel)
+        # Trails come from the location history the operations center records
+        self.gps_widget = GPSMapWidget(left_panel, location_store=LocationStore(
+            path=os.path.join(CACHE_DIR, "locations.db")))
         self.gps_widget.pack(fill="both", expand=True)
         
         # Right panel - Jobs and Communication
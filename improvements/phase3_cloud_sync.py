@@ -22,6 +22,11 @@ sys.path.append(r"c:\Users\Tewedros\teddys-cleaning-app\improvements")
 
 from database.db_manager import DatabaseManager
 from phase2_complete import CompleteOperationsCenter
+from geofence import GeofenceEngine, JobSiteFences, JOB_STATUS_ON_EVENT
+from geocoding import GeocodingService, GeocodeCache
+from route_cache import CACHE_DIR
+from fanout import FanOut
+from geo_utils import parse_coordinates
 
 class CloudSyncManager:
     def __init__(self):
@@ -29,6 +34,10 @@ class CloudSyncManager:
         self.mobile_clients = set()
         self.desktop_clients = set()
         self.db_manager = DatabaseManager()
+        self.geofences = GeofenceEngine()
+        self.job_sites = JobSiteFences(self.geofences, self.db_manager, GeocodingService(
+            cache=GeocodeCache(path=os.path.join(CACHE_DIR, "geocode_cache.db"))))
+        self.fanout = FanOut()
         
     async def start_cloud_server(self):
         """Start cloud synchronization server"""
@@ -43,6 +52,7 @@ class CloudSyncManager:
                 self.desktop_clients.add(websocket)
                 print(f"Desktop client connected: {len(self.desktop_clients)} total")
             
+            self.fanout.register(websocket)
             try:
                 await self.sync_initial_data(websocket)
                 async for message in websocket:
@@ -52,8 +62,10 @@ class CloudSyncManager:
             finally:
                 self.mobile_clients.discard(websocket)
                 self.desktop_clients.discard(websocket)
+                self.fanout.unregister(websocket)
         
         print("Starting cloud sync server on port 8766...")
+        print(f"Job-site geofences: {self.job_sites.load()} active jobs")
         async with websockets.serve(handle_client, "localhost", 8766):
             await asyncio.Future()
     
@@ -69,7 +81,9 @@ class CloudSyncManager:
             'timestamp': datetime.now().isoformat()
         }
         
-        await websocket.send(json.dumps(sync_data, default=str))
+        # Through the client's queue, so it goes out before any broadcast
+        # queued after it and never concurrently with the writer task
+        self.fanout.publish(sync_data, [websocket])
     
     async def handle_sync_message(self, websocket, message):
         """Handle synchronization messages"""
@@ -79,6 +93,8 @@ class CloudSyncManager:
             
             if msg_type == 'job_update':
                 await self.sync_job_update(data)
+            elif msg_type == 'job_created':
+                self.job_sites.refresh(data.get('job_id'))
             elif msg_type == 'location_update':
                 await self.sync_location_update(data)
             elif msg_type == 'message_broadcast':
@@ -99,6 +115,9 @@ class CloudSyncManager:
                 (status, job_id)
             )
             
+            # Cancelled and completed jobs lose their fence
+            self.job_sites.refresh(job_id)
+            
             # Broadcast to all clients
             sync_message = {
                 'type': 'job_sync',
@@ -112,8 +131,11 @@ class CloudSyncManager:
     async def sync_location_update(self, data):
         """Sync GPS location updates"""
         team_id = data.get('team_id')
-        lat = data.get('lat')
-        lng = data.get('lng')
+        coords = parse_coordinates(data.get('lat'), data.get('lng'))
+        if coords is None:
+            print(f"Dropping location update with bad coordinates: {data.get('lat')!r}, {data.get('lng')!r}")
+            return
+        lat, lng = coords
         
         sync_message = {
             'type': 'location_sync',
@@ -123,7 +145,14 @@ class CloudSyncManager:
             'timestamp': datetime.now().isoformat()
         }
         
-        await self.broadcast_to_all(json.dumps(sync_message))
+        await self.broadcast_to_all(json.dumps(sync_message), coalesce_key=f"location_sync:{team_id}")
+        
+        if team_id is not None:
+            for event in self.geofences.check(team_id, lat, lng, sync_message['timestamp']):
+                await self.broadcast_to_all(json.dumps(event))
+                status = JOB_STATUS_ON_EVENT.get(event['event'])
+                if event['job_id'] and status:
+                    await self.sync_job_update({'job_id': event['job_id'], 'status': status})
     
     async def sync_team_message(self, data):
         """Sync team messages"""
@@ -136,14 +165,13 @@ class CloudSyncManager:
         
         await self.broadcast_to_all(json.dumps(sync_message))
     
-    async def broadcast_to_all(self, message):
-        """Broadcast message to all connected clients"""
-        all_clients = self.mobile_clients | self.desktop_clients
-        if all_clients:
-            await asyncio.gather(
-                *[client.send(message) for client in all_clients],
-                return_exceptions=True
-            )
+    async def broadcast_to_all(self, message, coalesce_key=None):
+        """Broadcast message to all connected clients
+        
+        Encoded once and queued per client; slow clients are dropped by the
+        fan-out instead of stalling everyone else.
+        """
+        self.fanout.publish(message, self.mobile_clients | self.desktop_clients, coalesce_key)
 
 class AIEnhancedAnalytics(ctk.CTkFrame):
     def __init__(self, parent):
@@ -0,0 +1,203 @@
+"""
+Route Optimization Benchmark
+Seeded synthetic instances for comparing route engines on quality and runtime
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from quantum_optimization import QuantumOptimizer
+from gps_manager import GPSManager
+
+DEFAULT_SIZES = [10, 50, 100, 500, 1000, 5000]
+DEFAULT_SEEDS = [1, 2, 3]
+CSV_FIELDS = ['engine', 'stops', 'seed', 'status', 'distance_km', 'best_known_km', 'gap_pct',
+              'wall_time_s', 'peak_memory_mb', 'worker_peak_rss_mb']
+
+def generate_instance(n_stops, seed, center=(40.7128, -74.0060), radius_km=15.0):
+    """Seeded synthetic day: stops scattered in clusters around a city center"""
+    rng = random.Random(seed)
+    lat0, lng0 = center
+    km_per_deg_lat = 111.32
+    km_per_deg_lng = 111.32 * math.cos(math.radians(lat0))
+
+    # Jobs bunch up around a handful of neighbourhoods, like real bookings
+    n_clusters = max(1, int(math.sqrt(n_stops) / 2))
+    hubs = [(rng.uniform(-radius_km, radius_km), rng.uniform(-radius_km, radius_km))
+            for _ in range(n_clusters)]
+
+    locations = []
+    for _ in range(n_stops):
+        hub_x, hub_y = rng.choice(hubs)
+        x = hub_x + rng.gauss(0, radius_km / 8)
+        y = hub_y + rng.gauss(0, radius_km / 8)
+        locations.append((lat0 + y / km_per_deg_lat, lng0 + x / km_per_deg_lng))
+    return locations
+
+def coordinates_to_route(locations, ordered):
+    """Map an ordered list of coordinates back to indices into locations"""
+    positions = {}
+    for index, location in enumerate(locations):
+        positions.setdefault(tuple(location), []).append(index)
+    return [positions[tuple(location)].pop(0) for location in ordered]
+
+def run_quantum_annealing(locations, seed):
+    return QuantumOptimizer().quantum_annealing(locations, {}, seed=seed)[0], {}
+
+def run_parallel_annealing(locations, seed):
+    route, _, chain_stats = QuantumOptimizer().parallel_annealing(locations, {}, seed=seed)
+    peaks = [stats['peak_rss_mb'] for stats in chain_stats if stats.get('peak_rss_mb') is not None]
+    return route, {'worker_peak_rss_mb': max(peaks) if peaks else None}
+
+def run_gps_nearest_neighbor(locations, seed):
+    return coordinates_to_route(locations, GPSManager().optimize_route(list(locations))), {}
+
+# name -> (callable(locations, seed) -> (route indices, extra row fields),
+#          largest instance it is run on)
+ENGINES = {
+    'quantum_annealing': (run_quantum_annealing, 5000),
+    'parallel_annealing': (run_parallel_annealing, 5000),
+    'gps_nearest_neighbor': (run_gps_nearest_neighbor, 5000),
+}
+
+def measure(engine, locations, seed, track_memory):
+    """Run one engine once, returning (route, wall seconds, peak MB or None, extra fields)
+    
+    The peak comes from tracemalloc and only covers Python allocations in
+    this process; engines that fan out to worker processes report the
+    workers' peak RSS in the extra fields instead.
+    """
+    if track_memory:
+        # tracemalloc slows allocation down, so time and memory are
+        # measured on separate (identically seeded) runs
+        tracemalloc.start()
+        try:
+            engine(locations, seed)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = peak / (1024 * 1024)
+    else:
+        peak_mb = None
+
+    started = time.perf_counter()
+    route, extra = engine(locations, seed)
+    elapsed = time.perf_counter() - started
+
+    return route, elapsed, peak_mb, extra
+
+def run_benchmark(sizes=None, seeds=None, engines=None, track_memory=True, best_known=None):
+    """Run every engine on every (size, seed) instance
+
+    best_known optionally maps "stops:seed" to a reference distance (km); the
+    gap is measured against the better of that and the best engine result.
+    """
+    sizes = sizes or DEFAULT_SIZES
+    seeds = seeds or DEFAULT_SEEDS
+    engines = engines or list(ENGINES)
+    best_known = best_known or {}
+    scorer = QuantumOptimizer()
+    results = []
+
+    for n_stops in sizes:
+        for seed in seeds:
+            locations = generate_instance(n_stops, seed)
+            instance_results = []
+
+            for name in engines:
+                engine, max_stops = ENGINES[name]
+                row = {'engine': name, 'stops': n_stops, 'seed': seed}
+
+                if n_stops > max_stops:
+                    row['status'] = 'skipped'
+                    instance_results.append(row)
+                    continue
+
+                try:
+                    route, elapsed, peak_mb, extra = measure(engine, locations, seed, track_memory)
+                except Exception as e:
+                    row['status'] = f'error: {e}'
+                    instance_results.append(row)
+                    continue
+
+                if sorted(route) != list(range(n_stops)):
+                    row['status'] = 'invalid route'
+                    instance_results.append(row)
+                    continue
+
+                # Score every engine with the same distance function
+                row.update({
+                    'status': 'ok',
+                    'distance_km': scorer.calculate_route_distance(route, locations),
+                    'wall_time_s': elapsed,
+                    'peak_memory_mb': peak_mb
+                })
+                row.update(extra)
+                instance_results.append(row)
+                print(f"{name:>22} | {n_stops:>5} stops | seed {seed} | "
+                      f"{row['distance_km']:10.2f} km | {elapsed:8.3f} s")
+
+            distances = [row['distance_km'] for row in instance_results if row['status'] == 'ok']
+            reference = best_known.get(f"{n_stops}:{seed}")
+            if reference is not None:
+                distances.append(reference)
+
+            if distances:
+                best = min(distances)
+                for row in instance_results:
+                    row['best_known_km'] = best
+                    if row['status'] == 'ok' and best > 0:
+                        row['gap_pct'] = 100.0 * (row['distance_km'] - best) / best
+
+            results.extend(instance_results)
+
+    return results
+
+def write_json(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({'generated': datetime.now().isoformat(), 'results': results}, f, indent=2)
+
+def write_csv(results, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row in results:
+            writer.writerow({field: row.get(field, '') for field in CSV_FIELDS})
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark route optimization engines")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS)
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=list(ENGINES))
+    parser.add_argument("--output-dir", default="benchmark_results")
+    parser.add_argument("--best-known", help="JSON file mapping 'stops:seed' to a reference distance in km")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc peak memory runs (parent process only)")
+    args = parser.parse_args()
+
+    best_known = None
+    if args.best_known:
+        with open(args.best_known, "r", encoding="utf-8") as f:
+            best_known = json.load(f)
+
+    results = run_benchmark(args.sizes, args.seeds, args.engines,
+                            track_memory=not args.no_memory, best_known=best_known)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_path = os.path.join(args.output_dir, f"route_benchmark_{stamp}.json")
+    csv_path = os.path.join(args.output_dir, f"route_benchmark_{stamp}.csv")
+    write_json(results, json_path)
+    write_csv(results, csv_path)
+
+    print(f"Results written to {json_path} and {csv_path}")
+
+if __name__ == "__main__":
+    main()
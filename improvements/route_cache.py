@@ -0,0 +1,128 @@
+"""
+Route Solution Cache
+LRU cache of optimized routes keyed by a fingerprint of the stop set and constraints
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".teddys_cleaning")
+
+class RouteCache:
+    """LRU cache of route solutions with optional JSON persistence
+
+    The key ignores the order the stops are listed in, so the same stops
+    coming back from the database in a different order still hit. Routes are
+    stored as coordinates and mapped back to the caller's indices on a hit.
+    """
+
+    def __init__(self, max_entries=256, path=None, precision=6):
+        self.max_entries = max_entries
+        self.path = path
+        self.precision = precision
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if self.path:
+            self.load()
+
+    def canonical_point(self, location):
+        """Round a (lat, lng) pair so float noise does not change the key"""
+        lat, lng = location
+        return (round(float(lat), self.precision), round(float(lng), self.precision))
+
+    def fingerprint(self, locations, constraints=None):
+        """Stable hash of the stop set plus constraints"""
+        points = sorted(self.canonical_point(location) for location in locations)
+        payload = json.dumps({'stops': points, 'constraints': constraints or {}},
+                             sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, locations, constraints=None):
+        """Return (route, distance) in the caller's indices, or None on a miss"""
+        key = self.fingerprint(locations, constraints)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        # Map stored coordinates back onto this call's indices; duplicates
+        # are handed out in order
+        positions = {}
+        for index, location in enumerate(locations):
+            positions.setdefault(self.canonical_point(location), []).append(index)
+        route = [positions[tuple(point)].pop(0) for point in entry['route']]
+
+        return route, entry['distance']
+
+    def put(self, locations, constraints, route, distance):
+        """Store a solution for this stop set"""
+        key = self.fingerprint(locations, constraints)
+        self.entries[key] = {
+            'route': [list(self.canonical_point(locations[index])) for index in route],
+            'distance': distance
+        }
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+        if self.path:
+            self.save()
+
+    def clear(self):
+        """Drop every cached solution"""
+        self.entries.clear()
+        if self.path:
+            self.save()
+
+    def load(self):
+        """Load persisted entries, ignoring a missing or corrupt file"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        entries = data.get('entries') if isinstance(data, dict) else None
+        if not isinstance(entries, list):
+            print(f"Route cache ignored: unexpected format in {self.path}")
+            return
+
+        # Skip rows a hand edit or older version left in the wrong shape
+        for item in entries:
+            if isinstance(item, list) and len(item) == 2 and self.valid_entry(*item):
+                self.entries[item[0]] = item[1]
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def valid_entry(self, key, entry):
+        """True if a loaded (key, entry) pair has the shape put() writes"""
+        if not isinstance(key, str) or not isinstance(entry, dict):
+            return False
+        route = entry.get('route')
+        if not isinstance(route, list) or not isinstance(entry.get('distance'), (int, float)):
+            return False
+        return all(isinstance(point, list) and len(point) == 2 and
+                   all(isinstance(value, (int, float)) for value in point)
+                   for point in route)
+
+    def save(self):
+        """Persist entries atomically (write to a temp file, then replace)"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({'entries': list(self.entries.items())}, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Route cache save error: {e}")
@@ -0,0 +1,126 @@
+"""
+Spatial Index
+Grid-bucket index over projected GPS coordinates for nearest-neighbour queries
+"""
+
+import math
+
+from geo_utils import EARTH_RADIUS_KM
+
+class GridIndex:
+    """Uniform grid of buckets over locally projected (km) coordinates
+
+    Points are projected with an equirectangular projection around the mean
+    latitude, which is accurate to well under a percent across a city. Insert
+    and remove are O(1); nearest() scans outward ring by ring and stops as
+    soon as no unscanned cell can hold anything closer, so a nearest-neighbour
+    tour over n stops costs about O(n log n) instead of O(n^2).
+    """
+
+    def __init__(self, points=None, cell_size_km=None, reference_lat=None):
+        points = dict(points or {})
+
+        if reference_lat is None:
+            reference_lat = (sum(lat for lat, _ in points.values()) / len(points)) if points else 0.0
+        self.cos_lat = math.cos(math.radians(reference_lat))
+
+        if cell_size_km is None:
+            cell_size_km = self.suggest_cell_size(points)
+        self.cell_size = cell_size_km
+
+        self.cells = {}
+        self.positions = {}
+        for key, (lat, lng) in points.items():
+            self.insert(key, lat, lng)
+
+    def suggest_cell_size(self, points, per_cell=2):
+        """Cell edge (km) giving roughly per_cell points per occupied cell"""
+        if len(points) < 2:
+            return 1.0
+
+        projected = [self.project(lat, lng) for lat, lng in points.values()]
+        xs = [x for x, _ in projected]
+        ys = [y for _, y in projected]
+        area = max(max(xs) - min(xs), 1e-3) * max(max(ys) - min(ys), 1e-3)
+        return max(math.sqrt(area * per_cell / len(points)), 1e-3)
+
+    def project(self, lat, lng):
+        """Equirectangular projection to km"""
+        return (math.radians(lng) * EARTH_RADIUS_KM * self.cos_lat,
+                math.radians(lat) * EARTH_RADIUS_KM)
+
+    def cell_of(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def insert(self, key, lat, lng):
+        """Add (or move) a point"""
+        if key in self.positions:
+            self.remove(key)
+
+        x, y = self.project(lat, lng)
+        cell = self.cell_of(x, y)
+        self.cells.setdefault(cell, {})[key] = (x, y)
+        self.positions[key] = (x, y, cell)
+
+    def remove(self, key):
+        """Delete a point; empty buckets are dropped so scans skip them"""
+        x, y, cell = self.positions.pop(key)
+        bucket = self.cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self.cells[cell]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def nearest(self, lat, lng):
+        """Key of the closest indexed point (None when empty)"""
+        if not self.positions:
+            return None
+
+        x, y = self.project(lat, lng)
+        cx, cy = self.cell_of(x, y)
+        best_key, best_dist2 = None, math.inf
+
+        ring = 0
+        while True:
+            # Once a ring has more cells than there are occupied buckets,
+            # scanning the occupied buckets directly is cheaper
+            if 8 * ring > len(self.cells):
+                for bucket in self.cells.values():
+                    for key, (px, py) in bucket.items():
+                        dist2 = (px - x) ** 2 + (py - y) ** 2
+                        if dist2 < best_dist2:
+                            best_key, best_dist2 = key, dist2
+                return best_key
+
+            for cell in self.ring_cells(cx, cy, ring):
+                bucket = self.cells.get(cell)
+                if not bucket:
+                    continue
+                for key, (px, py) in bucket.items():
+                    dist2 = (px - x) ** 2 + (py - y) ** 2
+                    if dist2 < best_dist2:
+                        best_key, best_dist2 = key, dist2
+
+            # Anything outside rings 0..ring is at least ring cells away
+            if best_key is not None and best_dist2 <= (ring * self.cell_size) ** 2:
+                return best_key
+            ring += 1
+
+    def ring_cells(self, cx, cy, ring):
+        """Cells on the square ring at Chebyshev distance ring from (cx, cy)"""
+        if ring == 0:
+            yield (cx, cy)
+            return
+
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
+
@@ -0,0 +1,114 @@
+"""
+Geofence tests
+Job-site fences loaded from the jobs table and the events a GPS ping produces
+"""
+
+import asyncio
+
+import pytest
+
+from geo_utils import parse_coordinates
+from geocoding import GeocodingService, MockGeocoder
+from geofence import GeofenceEngine, JobSiteFences, JOB_STATUS_ON_EVENT
+
+SITE = (40.7128, -74.0060)
+FAR_AWAY = (40.7589, -73.9851)
+
+class JobsTable:
+    """Just enough of DatabaseManager.fetch_all for JobSiteFences"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetch_all(self, query, params=()):
+        if "j.id = ?" in query:
+            return [row for row in self.rows if row['id'] == params[0]]
+        return [row for row in self.rows if row['status'] in params]
+
+def job_row(job_id, status="Scheduled", location="123 Business Ave"):
+    return {'id': job_id, 'status': status, 'location': location,
+            'address': None, 'city': None, 'state': None, 'zip_code': None}
+
+def watched_sites(rows):
+    engine = GeofenceEngine()
+    sites = JobSiteFences(engine, JobsTable(rows), GeocodingService(MockGeocoder()))
+    return engine, sites
+
+def test_ping_at_job_site_fires_arrival_then_departure():
+    engine, sites = watched_sites([job_row(7)])
+    assert sites.load() == 1
+
+    arrival = engine.check("team_alpha", *SITE)
+    assert [(event['type'], event['job_id']) for event in arrival] == [('geofence_arrival', 7)]
+    assert engine.check("team_alpha", *SITE) == []
+
+    departure = engine.check("team_alpha", *FAR_AWAY)
+    assert [(event['type'], event['job_id']) for event in departure] == [('geofence_departure', 7)]
+
+def test_departure_does_not_complete_the_job():
+    assert JOB_STATUS_ON_EVENT.get('arrival') == 'In Progress'
+    assert 'departure' not in JOB_STATUS_ON_EVENT
+
+def test_ungeocodable_and_inactive_jobs_get_no_fence():
+    engine, sites = watched_sites([job_row(1, location="Location 1"), job_row(2, status="Completed")])
+    assert sites.load() == 0
+    assert engine.check("team_alpha", *SITE) == []
+
+def test_refresh_follows_status_changes():
+    rows = [job_row(7)]
+    engine, sites = watched_sites(rows)
+    sites.load()
+    engine.check("team_alpha", *SITE)
+
+    # Re-registering the unchanged site (e.g. after the arrival set it In
+    # Progress) must not fire a second arrival
+    rows[0]['status'] = "In Progress"
+    assert sites.refresh(7)
+    assert engine.check("team_alpha", *SITE) == []
+
+    rows[0]['status'] = "Cancelled"
+    assert not sites.refresh(7)
+    assert engine.fences == {}
+
+@pytest.mark.parametrize("lat, lng", [
+    ("north", "-74.0060"), ("NaN", -74.0060), (95.0, -74.0060), (40.7128, 181), (None, -74.0060)
+])
+def test_bad_coordinates_are_rejected(lat, lng):
+    assert parse_coordinates(lat, lng) is None
+
+def test_string_coordinates_reach_the_fence_as_numbers():
+    engine, sites = watched_sites([job_row(7)])
+    sites.load()
+    coords = parse_coordinates(str(SITE[0]), str(SITE[1]))
+    assert coords == SITE
+    assert [event['job_id'] for event in engine.check("team_alpha", *coords)] == [7]
+
+@pytest.mark.parametrize("lat, lng", [("-33.86", "151.21"), ("north", -74.0060), (-95.0, 151.21)])
+def test_cloud_sync_location_update_validates_coordinates(lat, lng):
+    # The sync manager module pulls in the desktop UI and websocket stack
+    pytest.importorskip("customtkinter")
+    pytest.importorskip("websockets")
+    from phase3_cloud_sync import CloudSyncManager
+
+    manager = CloudSyncManager.__new__(CloudSyncManager)
+    manager.geofences = GeofenceEngine()
+    manager.geofences.add_job_site(7, -33.86, 151.21)
+    sent = []
+
+    async def broadcast_to_all(message, coalesce_key=None):
+        sent.append(message)
+
+    async def sync_job_update(data):
+        sent.append(data)
+
+    manager.broadcast_to_all = broadcast_to_all
+    manager.sync_job_update = sync_job_update
+
+    asyncio.run(manager.sync_location_update({'team_id': "team_alpha", 'lat': lat, 'lng': lng}))
+
+    if parse_coordinates(lat, lng) is None:
+        assert sent == []
+    else:
+        # Relayed ping, arrival event, then the job moved to In Progress
+        assert len(sent) == 3
+        assert sent[-1] == {'job_id': 7, 'status': 'In Progress'}
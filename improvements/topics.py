@@ -0,0 +1,103 @@
+"""
+Topics
+Topic -> subscribers index so websocket traffic only goes to interested clients
+
+Topic names:
+    team:<team_id>          GPS fixes, geofence events and messages for one team
+    job:<job_id>            status changes and geofence events for one job
+    region:<row>:<col>      GPS fixes inside one REGION_CELL_DEG grid cell
+    channel:<name>          team chat channel (default "general")
+
+Clients send {"type": "subscribe", "topics": [...]} or "unsubscribe" with the
+same shape. "team_id", "job_id", "channel" and "region" ({lat, lng}) keys are
+accepted as shorthands. A client that has never subscribed gets everything,
+so the desktop dashboard keeps working unchanged.
+"""
+
+import math
+
+from geo_utils import parse_coordinates
+
+REGION_CELL_DEG = 0.05  # roughly 5 km
+
+def team_topic(team_id):
+    return f"team:{team_id}"
+
+def job_topic(job_id):
+    return f"job:{job_id}"
+
+def channel_topic(name):
+    return f"channel:{name or 'general'}"
+
+def region_topic(lat, lng, cell_deg=REGION_CELL_DEG):
+    return f"region:{math.floor(float(lat) / cell_deg)}:{math.floor(float(lng) / cell_deg)}"
+
+def topics_from_request(data):
+    """Topic names named in a subscribe/unsubscribe message (malformed parts are ignored)"""
+    topics = data.get('topics', [])
+    topics = [str(topic) for topic in topics] if isinstance(topics, list) else []
+    if data.get('team_id') is not None:
+        topics.append(team_topic(data['team_id']))
+    if data.get('job_id') is not None:
+        topics.append(job_topic(data['job_id']))
+    if data.get('channel'):
+        topics.append(channel_topic(data['channel']))
+
+    region = data.get('region')
+    coords = parse_coordinates(region.get('lat'), region.get('lng')) if isinstance(region, dict) else None
+    if coords is not None:
+        topics.append(region_topic(*coords))
+    return topics
+
+class TopicIndex:
+    """Subscribers per topic plus topics per client, kept in step
+
+    subscribers() walks only the sets of the topics being published to, so
+    routing a message costs its audience rather than every connection.
+    """
+
+    def __init__(self):
+        self.subscribers_by_topic = {}
+        self.topics_by_client = {}
+        self.unfiltered = set()
+
+    def add_client(self, client):
+        """New connections receive everything until they subscribe to something"""
+        self.topics_by_client[client] = set()
+        self.unfiltered.add(client)
+
+    def remove_client(self, client):
+        for topic in self.topics_by_client.pop(client, ()):
+            self.discard(topic, client)
+        self.unfiltered.discard(client)
+
+    def subscribe(self, client, topics):
+        owned = self.topics_by_client.setdefault(client, set())
+        for topic in topics:
+            self.subscribers_by_topic.setdefault(topic, set()).add(client)
+            owned.add(topic)
+        if owned:
+            self.unfiltered.discard(client)
+        return owned
+
+    def unsubscribe(self, client, topics):
+        """Drop topics; a client left with none stays filtered (receives nothing routed)"""
+        owned = self.topics_by_client.get(client, set())
+        for topic in topics:
+            owned.discard(topic)
+            self.discard(topic, client)
+        return owned
+
+    def discard(self, topic, client):
+        clients = self.subscribers_by_topic.get(topic)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del self.subscribers_by_topic[topic]
+
+    def subscribers(self, topics):
+        """Clients subscribed to any of topics, plus clients that never filtered"""
+        audience = set(self.unfiltered)
+        for topic in topics:
+            audience.update(self.subscribers_by_topic.get(topic, ()))
+        return audience
@@ -0,0 +1,87 @@
+"""
+Track Replay
+Time-indexed team tracks for trail rendering and O(log n) replay seeking
+"""
+
+import numpy as np
+
+import geo_utils
+
+class TrackTimeline:
+    """One team's pings as sorted NumPy arrays
+
+    position_at() and the trail cut-off use np.searchsorted, so seeking
+    anywhere in a full day of pings is O(log n). Douglas-Peucker results are
+    cached per tolerance, so a zoom level is simplified only once.
+    """
+
+    def __init__(self, pings):
+        history = np.asarray(pings, dtype=float).reshape(-1, 3)
+        order = np.argsort(history[:, 0], kind="stable")
+        self.times = history[order, 0]
+        self.coords = history[order, 1:]
+        self.simplified = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def start(self):
+        return float(self.times[0]) if len(self.times) else None
+
+    @property
+    def end(self):
+        return float(self.times[-1]) if len(self.times) else None
+
+    def position_at(self, timestamp):
+        """Interpolated (lat, lng) at timestamp; None before the first ping"""
+        if not len(self.times) or timestamp < self.times[0]:
+            return None
+
+        i = int(np.searchsorted(self.times, timestamp, side="right")) - 1
+        if i >= len(self.times) - 1:
+            return tuple(self.coords[-1])
+
+        t0, t1 = self.times[i], self.times[i + 1]
+        fraction = (timestamp - t0) / (t1 - t0) if t1 > t0 else 0.0
+        lat, lng = self.coords[i] + fraction * (self.coords[i + 1] - self.coords[i])
+        return float(lat), float(lng)
+
+    def kept_indices(self, tolerance_km):
+        """Douglas-Peucker indices for this tolerance (cached)"""
+        kept = self.simplified.get(tolerance_km)
+        if kept is None:
+            kept = self.simplified[tolerance_km] = geo_utils.douglas_peucker(self.coords, tolerance_km)
+        return kept
+
+    def trail(self, tolerance_km, until=None):
+        """Simplified (lat, lng) array of the track up to until (whole track if None)"""
+        kept = self.kept_indices(tolerance_km)
+        if until is None:
+            return self.coords[kept]
+
+        cut = int(np.searchsorted(self.times[kept], until, side="right"))
+        points = self.coords[kept[:cut]]
+
+        # End the trail exactly where the team is at that moment
+        position = self.position_at(until)
+        if position is not None and cut < len(kept):
+            points = np.vstack([points, position])
+        return points
+
+def load_timelines(location_store, team_ids, since=None, until=None):
+    """TrackTimeline per team from the location store (teams without pings are skipped)"""
+    timelines = {}
+    for team_id in team_ids:
+        pings = location_store.history(team_id, since, until)
+        if pings:
+            timelines[team_id] = TrackTimeline(pings)
+    return timelines
+
+def replay_bounds(timelines):
+    """(start, end) timestamps covered by a set of timelines, or None"""
+    starts = [timeline.start for timeline in timelines.values() if len(timeline)]
+    ends = [timeline.end for timeline in timelines.values() if len(timeline)]
+    if not starts:
+        return None
+    return min(starts), max(ends)
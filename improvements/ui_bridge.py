@@ -0,0 +1,98 @@
+"""
+UI Bridge
+Bounded queue carrying updates from worker threads to the Tk thread through one after() pump
+"""
+
+import queue
+import threading
+from collections import OrderedDict
+
+class UIBridge:
+    """Producer/consumer hand-off between background threads and Tk
+
+    Workers call post() and never touch widgets. The Tk thread drains the
+    queue once per frame from a single after() loop, keeps only the newest
+    update per (kind, key), dispatches them to the registered handlers and
+    then runs the flush callbacks once, so a burst of pings costs one
+    redraw. When the queue is full the oldest update is dropped - newer
+    positions supersede it anyway.
+    """
+
+    def __init__(self, widget, interval_ms=33, maxsize=5000):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.updates = queue.Queue(maxsize=maxsize)
+        self.handlers = {}
+        self.flush_callbacks = []
+        self.frame_callbacks = []
+        self.dropped = 0
+        self.running = False
+        self.put_lock = threading.Lock()
+
+    def subscribe(self, kind, handler):
+        """Run handler(key, payload) on the Tk thread for updates of this kind"""
+        self.handlers[kind] = handler
+
+    def on_flush(self, callback):
+        """Run callback() on the Tk thread after every frame that had updates"""
+        self.flush_callbacks.append(callback)
+
+    def on_frame(self, callback):
+        """Run callback() on the Tk thread every pump tick (for polling other queues)"""
+        self.frame_callbacks.append(callback)
+
+    def post(self, kind, key, payload=None):
+        """Queue an update; safe to call from any thread"""
+        with self.put_lock:
+            try:
+                self.updates.put_nowait((kind, key, payload))
+            except queue.Full:
+                try:
+                    self.updates.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                self.updates.put_nowait((kind, key, payload))
+
+    def start(self):
+        """Begin pumping (call on the Tk thread)"""
+        if not self.running:
+            self.running = True
+            self.widget.after(self.interval_ms, self.pump)
+
+    def stop(self):
+        self.running = False
+
+    def pump(self):
+        if not self.running:
+            return
+
+        try:
+            self.drain()
+            for callback in self.frame_callbacks:
+                callback()
+        except Exception as e:
+            print(f"UI update error: {e}")
+        self.widget.after(self.interval_ms, self.pump)
+
+    def drain(self):
+        """Apply everything queued so far; returns the number of coalesced updates"""
+        latest = OrderedDict()
+        # Bounded so producers cannot keep one drain going forever
+        for _ in range(self.updates.maxsize):
+            try:
+                kind, key, payload = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            latest.pop((kind, key), None)
+            latest[(kind, key)] = payload
+
+        for (kind, key), payload in latest.items():
+            handler = self.handlers.get(kind)
+            if handler is not None:
+                handler(key, payload)
+
+        if latest:
+            for callback in self.flush_callbacks:
+                callback()
+        return len(latest)
@@ -16,6 +16,14 @@ import os
 # Add database path
 sys.path.append(r"C:\Users\Tewedros\Desktop\teddy_cleaning_app_v2")
 from database.db_manager import DatabaseManager
+from geofence import GeofenceEngine, JobSiteFences, JOB_STATUS_ON_EVENT
+from geocoding import GeocodingService, GeocodeCache
+from route_cache import CACHE_DIR
+from dashboard_sync import DashboardStream
+from fanout import FanOut
+from geo_utils import parse_coordinates
+from topics import (TopicIndex, topics_from_request, team_topic, job_topic,
+                    channel_topic, region_topic)
 
 class WebSocketServer:
     def __init__(self, host="localhost", port=8765):
@@ -24,10 +32,26 @@ class WebSocketServer:
         self.clients = set()
         self.db_manager = DatabaseManager()
         self.db_manager.initialize_database()
+        self.geofences = GeofenceEngine()
+        self.job_sites = JobSiteFences(self.geofences, self.db_manager, GeocodingService(
+            cache=GeocodeCache(path=os.path.join(CACHE_DIR, "geocode_cache.db"))))
+        
+        # Dashboard pushes are versioned: clients get a snapshot, then deltas
+        # against the version they acknowledged, or a heartbeat
+        self.dashboard = DashboardStream()
+        self.client_versions = {}
+        
+        # Every client gets its own bounded send queue and writer task
+        self.fanout = FanOut()
+        
+        # Team, job, region and chat traffic only goes to subscribed clients
+        self.topics = TopicIndex()
         
     async def register_client(self, websocket, path):
         """Register new client connection"""
         self.clients.add(websocket)
+        self.fanout.register(websocket)
+        self.topics.add_client(websocket)
         print(f"Client connected. Total clients: {len(self.clients)}")
         
         try:
@@ -42,6 +66,9 @@ class WebSocketServer:
             pass
         finally:
             self.clients.remove(websocket)
+            self.client_versions.pop(websocket, None)
+            self.fanout.unregister(websocket)
+            self.topics.remove_client(websocket)
             print(f"Client disconnected. Total clients: {len(self.clients)}")
     
     async def handle_message(self, websocket, message):
@@ -54,22 +81,47 @@ class WebSocketServer:
                 await self.broadcast_team_message(data)
             elif msg_type == 'job_update':
                 await self.handle_job_update(data)
+            elif msg_type == 'job_created':
+                self.job_sites.refresh(data.get('job_id'))
             elif msg_type == 'gps_update':
                 await self.handle_gps_update(data)
+            elif msg_type == 'dashboard_ack':
+                # Anything we never issued (wrong type, future or negative) means a full snapshot
+                self.client_versions[websocket] = self.dashboard.valid_version(data.get('version'))
+            elif msg_type == 'dashboard_resync':
+                self.client_versions[websocket] = None
+                await self.send_dashboard_update(websocket)
+            elif msg_type == 'subscribe':
+                topics = self.topics.subscribe(websocket, topics_from_request(data))
+                await self.send_subscriptions(websocket, topics)
+            elif msg_type == 'unsubscribe':
+                topics = self.topics.unsubscribe(websocket, topics_from_request(data))
+                await self.send_subscriptions(websocket, topics)
                 
         except json.JSONDecodeError:
             print(f"Invalid JSON received: {message}")
     
+    async def send_subscriptions(self, websocket, topics):
+        """Confirm a client's current topic list"""
+        await self.send_to([websocket], {'type': 'subscriptions', 'topics': sorted(topics)})
+    
     async def broadcast_team_message(self, data):
-        """Broadcast team message to all clients"""
+        """Send a team message to its channel (and team, if addressed to one)"""
+        channel = data.get('channel') or 'general'
         message = {
             'type': 'team_message',
             'sender': data.get('sender', 'Unknown'),
             'message': data.get('message', ''),
+            'channel': channel,
             'timestamp': datetime.now().strftime("%H:%M:%S")
         }
         
-        await self.broadcast(json.dumps(message))
+        topics = [channel_topic(channel)]
+        if data.get('team_id') is not None:
+            message['team_id'] = data['team_id']
+            topics.append(team_topic(data['team_id']))
+        
+        await self.publish(topics, json.dumps(message))
     
     async def handle_job_update(self, data):
         """Handle job status updates"""
@@ -83,6 +135,9 @@ class WebSocketServer:
                 (status, job_id)
             )
             
+            # Cancelled and completed jobs lose their fence
+            self.job_sites.refresh(job_id)
+            
             # Broadcast update
             update = {
                 'type': 'job_update',
@@ -91,15 +146,22 @@ class WebSocketServer:
                 'timestamp': datetime.now().isoformat()
             }
             
-            await self.broadcast(json.dumps(update))
+            topics = [job_topic(job_id)]
+            if data.get('team_id') is not None:
+                update['team_id'] = data['team_id']
+                topics.append(team_topic(data['team_id']))
+            
+            await self.publish(topics, json.dumps(update))
     
     async def handle_gps_update(self, data):
         """Handle GPS location updates"""
         team_id = data.get('team_id')
-        lat = data.get('lat')
-        lng = data.get('lng')
+        coords = parse_coordinates(data.get('lat'), data.get('lng'))
         
-        if team_id and lat and lng:
+        if team_id and coords is None:
+            print(f"Dropping GPS update with bad coordinates: {data.get('lat')!r}, {data.get('lng')!r}")
+        elif team_id:
+            lat, lng = coords
             update = {
                 'type': 'gps_update',
                 'team_id': team_id,
@@ -108,45 +170,75 @@ class WebSocketServer:
                 'timestamp': datetime.now().isoformat()
             }
             
-            await self.broadcast(json.dumps(update))
+            # Queued fixes for the same team are replaced, not piled up
+            await self.publish([team_topic(team_id), region_topic(lat, lng)], json.dumps(update),
+                               coalesce_key=f"gps_update:{team_id}")
+            
+            # Arriving at or leaving a job site updates the job automatically
+            for event in self.geofences.check(team_id, lat, lng, update['timestamp']):
+                topics = [team_topic(team_id)]
+                if event['job_id']:
+                    topics.append(job_topic(event['job_id']))
+                await self.publish(topics, json.dumps(event))
+                
+                status = JOB_STATUS_ON_EVENT.get(event['event'])
+                if event['job_id'] and status:
+                    await self.handle_job_update({'job_id': event['job_id'], 'status': status,
+                                                  'team_id': team_id})
     
     async def send_dashboard_update(self, websocket=None):
-        """Send dashboard data update"""
-        dashboard_data = self.db_manager.get_dashboard_data()
+        """Send dashboard data update
         
-        update = {
-            'type': 'dashboard_update',
-            'data': dashboard_data,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        message = json.dumps(update, default=str)
+        A single client (just connected or resyncing) gets a full snapshot.
+        Otherwise every client gets what it is missing since its acknowledged
+        version: a patch, a snapshot if it fell out of the delta history, or a
+        heartbeat when nothing changed. One message is encoded per version.
+        """
+        self.dashboard.update(self.db_manager.get_dashboard_data())
         
         if websocket:
-            await websocket.send(message)
-        else:
-            await self.broadcast(message)
+            await self.send_to([websocket], self.dashboard.snapshot_message())
+            return
+        
+        groups = {}
+        for client in self.clients:
+            groups.setdefault(self.client_versions.get(client), []).append(client)
+        
+        for version, clients in groups.items():
+            await self.send_to(clients, self.dashboard.message_for(version))
     
-    async def broadcast(self, message):
+    async def publish(self, topics, message, coalesce_key=None):
+        """Send message to clients subscribed to any of topics (and unfiltered clients)"""
+        await self.send_to(self.topics.subscribers(topics), message, coalesce_key)
+    
+    async def broadcast(self, message, coalesce_key=None):
         """Broadcast message to all connected clients"""
-        if self.clients:
-            await asyncio.gather(
-                *[client.send(message) for client in self.clients],
-                return_exceptions=True
-            )
+        await self.send_to(self.clients, message, coalesce_key)
+    
+    async def send_to(self, clients, message, coalesce_key=None):
+        """Queue one message for a group of clients
+        
+        The message is encoded once and handed to each client's writer task,
+        so a slow client never holds up the others.
+        """
+        self.fanout.publish(message, clients, coalesce_key)
     
     def start_periodic_updates(self):
-        """Start periodic dashboard updates"""
+        """Start periodic dashboard updates (deltas, or heartbeats when unchanged)"""
         async def update_loop():
             while True:
                 await asyncio.sleep(5)  # 5-second intervals
-                await self.send_dashboard_update()
+                try:
+                    await self.send_dashboard_update()
+                except Exception as e:
+                    print(f"Dashboard update error: {e}")
         
         asyncio.create_task(update_loop())
     
     async def start_server(self):
         """Start the WebSocket server"""
         print(f"Starting WebSocket server on {self.host}:{self.port}")
+        print(f"Job-site geofences: {self.job_sites.load()} active jobs")
         
         # Start periodic updates
         self.start_periodic_updates()